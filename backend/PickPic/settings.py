@@ -160,6 +160,98 @@ GS_CREDENTIALS, _ = default()
 GS_BUCKET_NAME = "pick-pic"
 DEFAULT_FILE_STORAGE = "storages.backends.gcloud.GoogleCloudStorage"
 
+# Shared storage client: keep-alive connection pool size and retry/backoff (seconds)
+GCS_POOL_SIZE = int(os.getenv('GCS_POOL_SIZE', 32))
+GCS_RETRY_INITIAL_DELAY = 0.5
+GCS_RETRY_MAX_DELAY = 8.0
+GCS_RETRY_MULTIPLIER = 2.0
+GCS_RETRY_TIMEOUT = 30.0
+
+# Image downloads are streamed to the client in chunks of this many bytes
+GCS_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Image reads: "proxy" streams bytes through Django, "redirect" answers with a 302 to a signed URL,
+# "url" returns the signed URL as JSON. Clients can override it per request with ?mode=
+IMAGE_READ_MODE = os.getenv('IMAGE_READ_MODE', 'proxy')
+
+# How long clients may cache image responses whose URL always refers to the same blob (seconds)
+IMAGE_CACHE_MAX_AGE = 31536000
+
+# Signed URL lifetime, how close to expiry a cached URL is replaced, and how many are cached (seconds / entries)
+SIGNED_URL_EXPIRATION = 900
+SIGNED_URL_REFRESH_MARGIN = 120
+SIGNED_URL_CACHE_SIZE = 10000
+
+# Direct-to-storage upload sessions: maximum uploads per session and upload URL lifetime (seconds)
+UPLOAD_SESSION_MAX_BATCH = 200
+UPLOAD_SESSION_URL_EXPIRATION = 3600
+
+# Batch uploads: maximum images per request and the size of the shared storage upload thread pool
+BATCH_UPLOAD_MAX_FILES = 200
+BATCH_UPLOAD_WORKERS = int(os.getenv('BATCH_UPLOAD_WORKERS', 8))
+DATA_UPLOAD_MAX_NUMBER_FILES = BATCH_UPLOAD_MAX_FILES
+
+# Bulk deletes: maximum images per request; background blob deletion retries and exponential backoff (seconds)
+BULK_DELETE_MAX_IMAGES = 500
+BLOB_DELETE_MAX_ATTEMPTS = 5
+BLOB_DELETE_BACKOFF = 1.0
+BLOB_DELETE_WORKERS = 4
+
+# Largest number of votes accepted by one batch vote request
+VOTE_BATCH_MAX_SIZE = 200
+
+# Optional write-behind buffering of single votes, flushed every interval or once this many are pending.
+# Buffers are per worker, so a user's unflushed votes are only hidden from their feeds by the worker that took them
+VOTE_BUFFER_ENABLED = os.getenv('VOTE_BUFFER_ENABLED', 'false').lower() == 'true'
+VOTE_BUFFER_FLUSH_INTERVAL = 2.0
+VOTE_BUFFER_MAX_PENDING = 1000
+
+# Per-event top images kept in memory, rebuilt after LEADERBOARD_TTL seconds to pick up other workers' votes
+LEADERBOARD_SIZE = 50
+LEADERBOARD_TTL = 30.0
+LEADERBOARD_MAX_EVENTS = 1000
+LEADERBOARD_MAX_K = 100
+
+# "Next image to rate" favours images that could still move in or out of the top NEXT_IMAGE_TOP_K
+NEXT_IMAGE_TOP_K = 5
+NEXT_IMAGE_JITTER = 0.02
+NEXT_IMAGE_MAX_LIMIT = 50
+
+# Elo K-factor for events ranked by pairwise comparisons
+PAIRWISE_ELO_K = 32
+
+# Unranked image feed page size; None returns every image (what existing clients expect)
+UNRANKED_DEFAULT_LIMIT = None
+UNRANKED_MAX_LIMIT = 500
+
+# Binary collation used to read blob names from the database in the same byte order as the bucket listing
+BLOB_NAME_COLLATION = 'utf8mb4_bin'
+
+# How long a legacy blob name with no alias (not renamed by migrate_blob_names yet) is cached (seconds)
+BLOB_ALIAS_NEGATIVE_TTL = 60
+
+# Deleted events are purged in the background, this many images (or related rows) per transaction
+EVENT_PURGE_CHUNK_SIZE = 500
+
+# Largest chunk accepted by a single PATCH to a resumable upload
+RESUMABLE_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Thumbnail/medium/WebP renditions: worker processes, encoder quality and how long a read
+# waits for a missing rendition to be generated (seconds)
+RENDITION_WORKERS = int(os.getenv('RENDITION_WORKERS', 2))
+RENDITION_QUALITY = 82
+RENDITION_TIMEOUT = 30
+
+# Local disk LRU cache in front of storage, shared by the worker processes on a host
+BLOB_CACHE_ENABLED = os.getenv('BLOB_CACHE_ENABLED', 'true').lower() == 'true'
+BLOB_CACHE_DIR = os.getenv('BLOB_CACHE_DIR', '/tmp/pickpic-blob-cache')
+BLOB_CACHE_MAX_BYTES = int(os.getenv('BLOB_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+BLOB_CACHE_MAX_OBJECT_SIZE = 32 * 1024 * 1024
+# Each worker re-reads the shared directory's size at least this often (seconds) before deciding to evict
+BLOB_CACHE_RESCAN_INTERVAL = 30
+# Every this many lookups each worker logs its hit/miss counters (0 turns the log line off)
+BLOB_CACHE_STATS_LOG_INTERVAL = int(os.getenv('BLOB_CACHE_STATS_LOG_INTERVAL', 1000))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -168,6 +260,29 @@ REST_FRAMEWORK = {
     ),
 }
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024
+# Image bodies are streamed (see app/uploads.py) and are not subject to this limit
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024
+
+# Streamed image uploads: maximum size, in-memory spool threshold (larger bodies go to a temp file),
+# per-process memory budget for in-flight uploads and how long a request waits for budget (seconds)
+IMAGE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+UPLOAD_SPOOL_THRESHOLD = 2621440
+UPLOAD_MEMORY_BUDGET = int(os.getenv('UPLOAD_MEMORY_BUDGET', 128 * 1024 * 1024))
+UPLOAD_BUDGET_TIMEOUT = 10
+
+# Uploads larger than one chunk use a resumable storage upload (must be a multiple of 256 KiB)
+GCS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+from .firebase_config import *
+
+# Verified Firebase ID tokens are cached (by hash) until they expire
+FIREBASE_TOKEN_CACHE_SIZE = 10000
 
-from .firebase_config import *
\ No newline at end of file
+# Verify ID tokens locally with PyJWT; signing keys are fetched on first use and refreshed in the background
+FIREBASE_LOCAL_VERIFICATION = os.getenv('FIREBASE_LOCAL_VERIFICATION', 'true').lower() == 'true'
+# Optional {kid: PEM} JSON file used instead of Google's endpoint (offline tests and benchmarks)
+FIREBASE_SIGNING_KEYS_FILE = os.getenv('FIREBASE_SIGNING_KEYS_FILE')
+FIREBASE_SIGNING_KEYS_REFRESH_MARGIN = 300
+# Tokens naming an unknown key id trigger an early refresh at most this often (seconds)
+FIREBASE_SIGNING_KEYS_MIN_REFRESH_INTERVAL = 60
+FIREBASE_TOKEN_LEEWAY = 0
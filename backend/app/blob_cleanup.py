@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import close_old_connections
+import atexit
+import queue
+import threading
+import time
+
+from .models import BlobDeletionFailure
+from .google_cloud_storage.bucket import delete_many_from_gcs
+
+class BlobDeleter:
+    """
+    Deletes blobs on background threads, so requests never wait on storage deletes.
+
+    Queued names are collected into batches of up to batch_size and deleted with batch
+    requests. Failed deletes are retried with exponential backoff; after max_attempts
+    they are recorded as BlobDeletionFailure rows for retry_blob_deletions to reconcile.
+    """
+
+    def __init__(self, batch_size=100, max_attempts=5, backoff=1.0, workers=1):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.workers = workers
+
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, bucket_name, blob_names):
+        for blob_name in blob_names:
+            self._queue.put((bucket_name, blob_name))
+        self._ensure_started()
+
+    def _ensure_started(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"blob-deleter-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self):
+        """Blocks for the first item, then takes whatever else is already queued, up to batch_size."""
+        items = [self._queue.get()]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._next_batch()
+            try:
+                self.delete(items)
+            except Exception as e:
+                print(f"Blob deleter failed: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def delete(self, items):
+        """Deletes (bucket_name, blob_name) pairs with retries, recording the ones that still fail."""
+        by_bucket = {}
+        for bucket_name, blob_name in items:
+            by_bucket.setdefault(bucket_name, []).append(blob_name)
+
+        for bucket_name, blob_names in by_bucket.items():
+            failures = {}
+            for attempt in range(self.max_attempts):
+                failures = delete_many_from_gcs(bucket_name, blob_names)
+                if not failures:
+                    break
+
+                blob_names = list(failures)
+                time.sleep(self.backoff * 2 ** attempt)
+
+            if failures:
+                record_failures(bucket_name, failures, self.max_attempts)
+
+    def drain(self, timeout=None):
+        """Waits until everything queued so far has been processed (or timeout seconds pass)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+def record_failures(bucket_name, failures, attempts):
+    close_old_connections()
+    for blob_name, error in failures.items():
+        failure, created = BlobDeletionFailure.objects.get_or_create(
+            bucket=bucket_name, blob_name=blob_name, defaults={"error": error, "attempts": attempts}
+        )
+        if not created:
+            failure.error = error
+            failure.attempts += attempts
+            failure.save()
+
+_deleter = None
+_deleter_lock = threading.Lock()
+
+def get_blob_deleter():
+    global _deleter
+
+    if _deleter is None:
+        with _deleter_lock:
+            if _deleter is None:
+                _deleter = BlobDeleter(
+                    max_attempts=getattr(settings, "BLOB_DELETE_MAX_ATTEMPTS", 5),
+                    backoff=getattr(settings, "BLOB_DELETE_BACKOFF", 1.0),
+                    workers=getattr(settings, "BLOB_DELETE_WORKERS", 4),
+                )
+                atexit.register(_deleter.drain, getattr(settings, "BLOB_DELETE_DRAIN_TIMEOUT", 30))
+
+    return _deleter
+
+def enqueue_blob_deletions(bucket_name, blob_names):
+    """Queues blobs for deletion in the background."""
+    if blob_names:
+        get_blob_deleter().enqueue(bucket_name, list(blob_names))
@@ -0,0 +1,206 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Count
+from django.db.models.functions import Collate
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import heapq
+
+from .models import Image, User, StoredBlob, PendingUpload, ResumableUpload
+from .google_cloud_storage.bucket import list_from_gcs, delete_many_from_gcs
+
+def sorted_keys(model, field, page_size=2000, **filters):
+    """
+    Yields the distinct non-empty values of a column in byte order, one page at a time.
+
+    Pages are fetched by keyset (value > last value seen), so memory stays constant
+    whatever the table size. The column is compared with a binary collation so the order
+    matches the bucket listing.
+    """
+    collation = getattr(settings, "BLOB_NAME_COLLATION", "utf8mb4_bin")
+    queryset = (
+        model.objects.filter(**filters)
+        .exclude(**{f"{field}__isnull": True})
+        .exclude(**{field: ""})
+        .annotate(sort_key=Collate(F(field), collation))
+        .order_by("sort_key")
+    )
+
+    last = None
+    while True:
+        page_queryset = queryset if last is None else queryset.filter(sort_key__gt=last)
+        page = list(page_queryset.values_list(field, flat=True).distinct()[:page_size])
+        if not page:
+            return
+
+        yield from page
+        last = page[-1]
+
+def referenced_keys():
+    """
+    Yields every blob name or prefix the database references, merged into one sorted stream.
+
+    StoredBlob rows count as references so blobs whose first Image is still being created
+    are kept; reconcile_stored_blobs removes the rows nothing references any more.
+
+    A referenced key also covers the objects named <key>.<suffix> (renditions) and
+    <key>/<part> (resumable upload chunks).
+    """
+    now = timezone.now()
+
+    streams = [
+        sorted_keys(Image, "file_name"),
+        sorted_keys(User, "profile_picture"),
+        sorted_keys(StoredBlob, "blob_name"),
+        sorted_keys(PendingUpload, "blob_name", expiration_date__gt=now),
+        # Only a handful of uploads are in progress at any time
+        iter(sorted(
+            f"uploads/{upload_id}"
+            for upload_id in ResumableUpload.objects.filter(expiration_date__gt=now).values_list("upload_id", flat=True)
+        )),
+    ]
+
+    last = None
+    for key in heapq.merge(*streams):
+        # A wrong database collation would silently mark live blobs as orphans, so refuse to continue
+        if last is not None and key < last:
+            raise RuntimeError(f"database keys are not in byte order ({last!r} before {key!r}), check BLOB_NAME_COLLATION")
+        last = key
+        yield key
+
+def find_orphan_blobs(bucket_name, grace=timedelta(hours=24)):
+    """
+    Yields the blobs in the bucket that nothing in the database references.
+
+    The bucket listing and the database keys are both streamed in sorted order and
+    merge-joined, so memory use is constant. Blobs created within the grace period are
+    skipped, since their rows may not be committed yet.
+    """
+    cutoff = timezone.now() - grace
+    keys = referenced_keys()
+
+    current = None
+    upcoming = next(keys, None)
+
+    for blob in list_from_gcs(bucket_name):
+        name = blob.name
+
+        # current: the greatest referenced key <= name
+        while upcoming is not None and upcoming <= name:
+            current = upcoming
+            upcoming = next(keys, None)
+
+        if current is not None and (name == current or name.startswith(current + ".") or name.startswith(current + "/")):
+            continue
+
+        if blob.time_created is not None and blob.time_created > cutoff:
+            continue
+
+        yield blob
+
+def purge_expired_uploads():
+    """Removes upload session and resumable upload rows that can no longer be finished."""
+    now = timezone.now()
+    PendingUpload.objects.filter(expiration_date__lte=now).delete()
+    ResumableUpload.objects.filter(expiration_date__lte=now).delete()
+
+def reconcile_stored_blobs(bucket_name, grace=timedelta(hours=24), fix=False, chunk_size=500):
+    """
+    Checks dedup index reference counts against the Image and User rows that use each blob.
+
+    A count can drift above the real number of references when the referencing rows go
+    without release_blobs (e.g. a cascade delete), and then the blob would be kept
+    forever. Only rows whose count has not changed within the grace period are checked,
+    so references taken by uploads still in progress are never miscounted.
+
+    Args:
+        bucket_name: The bucket whose index is checked.
+        grace: Minimum time since a row's count last changed.
+        fix: Correct the counts, deleting rows nothing references. Their blobs are then
+            unreferenced and removed by the orphan collection that follows.
+        chunk_size: Number of rows checked per transaction.
+
+    Returns:
+        dict: Counts of rows whose count was wrong and of rows nothing references.
+    """
+    cutoff = timezone.now() - grace
+    stats = {"miscounted": 0, "unreferenced": 0}
+
+    last = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StoredBlob.objects.select_for_update()
+                .filter(bucket=bucket_name, updated_at__lt=cutoff, pk__gt=last)
+                .order_by("pk")[:chunk_size]
+            )
+            if not rows:
+                return stats
+            last = rows[-1].pk
+
+            names = [row.blob_name for row in rows]
+            references = dict.fromkeys(names, 0)
+            for model, field in ((Image, "file_name"), (User, "profile_picture")):
+                counts = model.objects.filter(**{f"{field}__in": names}).values(field).annotate(count=Count("pk"))
+                for row in counts:
+                    references[row[field]] += row["count"]
+
+            unreferenced = [row.pk for row in rows if references[row.blob_name] == 0]
+            miscounted = [row for row in rows if references[row.blob_name] and references[row.blob_name] != row.ref_count]
+            stats["unreferenced"] += len(unreferenced)
+            stats["miscounted"] += len(miscounted)
+
+            if fix:
+                StoredBlob.objects.filter(pk__in=unreferenced).delete()
+                for row in miscounted:
+                    StoredBlob.objects.filter(pk=row.pk).update(ref_count=references[row.blob_name], updated_at=timezone.now())
+
+def collect_orphan_blobs(bucket_name, delete=False, grace=timedelta(hours=24), workers=4, batch_size=100, report=None):
+    """
+    Finds (and optionally deletes) orphan blobs. Safe to run on a schedule.
+
+    Args:
+        bucket_name: The bucket to reconcile.
+        delete: Delete the orphans instead of only reporting them.
+        grace: Minimum age of a blob before it can be considered an orphan.
+        workers: Number of batch delete requests in flight at once.
+        batch_size: Number of deletes per batch request.
+        report: Optional callable receiving each orphan blob.
+
+    Returns:
+        dict: Counts of orphans found, their bytes, deletes that failed, and dedup index
+        rows whose reference count was wrong or that nothing references.
+    """
+    purge_expired_uploads()
+
+    stats = {"orphans": 0, "bytes": 0, "failed": 0}
+    stats.update(reconcile_stored_blobs(bucket_name, grace, fix=delete))
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+
+        for blob in find_orphan_blobs(bucket_name, grace):
+            stats["orphans"] += 1
+            stats["bytes"] += blob.size or 0
+            if report is not None:
+                report(blob)
+
+            if delete:
+                batch.append(blob.name)
+                if len(batch) == batch_size:
+                    futures.append(executor.submit(delete_many_from_gcs, bucket_name, batch))
+                    batch = []
+
+                # Keep the number of outstanding batches bounded
+                if len(futures) >= workers * 2:
+                    stats["failed"] += len(futures.pop(0).result())
+
+        if batch:
+            futures.append(executor.submit(delete_many_from_gcs, bucket_name, batch))
+
+        for future in futures:
+            stats["failed"] += len(future.result())
+
+    return stats
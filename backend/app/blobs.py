@@ -0,0 +1,185 @@
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from django.db.models import F, Case, When, Value, PositiveIntegerField
+from collections import Counter
+
+from .models import StoredBlob
+from .helper import new_blob_name
+from .renditions import SIZES, rendition_name
+from .blob_cleanup import enqueue_blob_deletions
+from .google_cloud_storage.bucket import upload_file_to_gcs, delete_from_gcs
+
+def acquire_blob(bucket_name, digest):
+    """Takes a reference on the stored blob with this content, returning its name, or None if there is none."""
+    with transaction.atomic():
+        stored = StoredBlob.objects.select_for_update().filter(bucket=bucket_name, digest=digest).first()
+        if stored is None:
+            return None
+
+        StoredBlob.objects.filter(pk=stored.pk).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+        return stored.blob_name
+
+def store_blob(bucket_name, file, size, digest, content_type):
+    """
+    Stores uploaded content once per bucket and returns the blob name to reference it by.
+
+    If the same content (by SHA-256) is already stored, the upload is skipped and the
+    existing blob gains a reference. Every reference must later be dropped with
+    release_blob.
+
+    Returns:
+        (blob_name, created): created is False when an existing blob was reused.
+    """
+    blob_name = acquire_blob(bucket_name, digest)
+    if blob_name is not None:
+        return blob_name, False
+
+    blob_name = new_blob_name(content_type, digest)
+    upload_file_to_gcs(bucket_name, file, blob_name, content_type, size=size)
+
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.create(bucket=bucket_name, digest=digest, blob_name=blob_name, ref_count=1)
+    except IntegrityError:
+        # A concurrent upload of the same content registered first: use that blob and drop ours
+        delete_from_gcs(bucket_name, blob_name)
+        existing = acquire_blob(bucket_name, digest)
+        if existing is None:
+            raise
+        return existing, False
+
+    return blob_name, True
+
+def upload_blobs(bucket_name, uploads, executor):
+    """
+    Uploads the distinct contents of a batch that are not stored yet, in parallel.
+
+    A failed upload only fails its own content; the others are still uploaded and
+    returned, so the caller can register them and report the failures per item.
+
+    Args:
+        bucket_name: The bucket to upload to.
+        uploads: {digest: (file, size, content_type)}, one entry per distinct content.
+        executor: The thread pool that runs the uploads.
+
+    Returns:
+        (uploaded, failed): {digest: blob_name} for every content that was uploaded, and
+        {digest: error} for every content that could not be.
+    """
+    known = set(StoredBlob.objects.filter(bucket=bucket_name, digest__in=list(uploads)).values_list('digest', flat=True))
+
+    def upload(digest, file, size, content_type):
+        blob_name = new_blob_name(content_type, digest)
+        file.seek(0)
+        upload_file_to_gcs(bucket_name, file, blob_name, content_type, size=size)
+        return blob_name
+
+    futures = {
+        digest: executor.submit(upload, digest, file, size, content_type)
+        for digest, (file, size, content_type) in uploads.items()
+        if digest not in known
+    }
+
+    uploaded = {}
+    failed = {}
+    for digest, future in futures.items():
+        try:
+            uploaded[digest] = future.result()
+        except Exception as e:
+            failed[digest] = e
+
+    return uploaded, failed
+
+def register_blobs(bucket_name, reference_counts, uploaded):
+    """
+    Records references for a batch of contents in the dedup index. Must run inside the
+    transaction that creates the referencing rows.
+
+    Contents already in the index gain their references in one grouped UPDATE; newly
+    uploaded ones are inserted with bulk_create. If another request registered the same
+    content meanwhile, its blob wins and ours is returned for deletion.
+
+    Args:
+        bucket_name: The bucket the blobs are in.
+        reference_counts: {digest: number of new references}.
+        uploaded: {digest: blob_name} of the uploads upload_blobs stored.
+
+    Returns:
+        (blob_names, discarded): {digest: blob_name} to reference, and the uploaded blob
+        names that lost to an existing blob. Digests missing from blob_names were neither
+        stored nor uploaded (their blob was deleted meanwhile).
+    """
+    stored = {
+        blob.digest: blob
+        for blob in StoredBlob.objects.select_for_update().filter(bucket=bucket_name, digest__in=list(reference_counts))
+    }
+
+    if stored:
+        StoredBlob.objects.filter(pk__in=[blob.pk for blob in stored.values()]).update(
+            ref_count=F('ref_count') + Case(
+                *[When(pk=blob.pk, then=Value(reference_counts[digest])) for digest, blob in stored.items()],
+                output_field=PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    StoredBlob.objects.bulk_create([
+        StoredBlob(bucket=bucket_name, digest=digest, blob_name=blob_name, ref_count=reference_counts[digest])
+        for digest, blob_name in uploaded.items()
+        if digest not in stored
+    ])
+
+    blob_names = {digest: blob.blob_name for digest, blob in stored.items()}
+    blob_names.update({digest: blob_name for digest, blob_name in uploaded.items() if digest not in stored})
+    discarded = [blob_name for digest, blob_name in uploaded.items() if digest in stored]
+
+    return blob_names, discarded
+
+def release_blobs(bucket_name, blob_names):
+    """
+    Drops one reference per name (a name may appear several times). Must run inside the
+    transaction that deletes the referencing rows.
+
+    Blobs that are not in the dedup index (legacy uploads, upload sessions) have a single
+    owner and are released straight away.
+
+    Returns:
+        The blob names, with their renditions, that nothing references any more and that
+        should be deleted from storage once the transaction commits.
+    """
+    counts = Counter(name for name in blob_names if name)
+
+    stored = {
+        blob.blob_name: blob
+        for blob in StoredBlob.objects.select_for_update().filter(bucket=bucket_name, blob_name__in=list(counts))
+    }
+
+    released = [name for name in counts if name not in stored or stored[name].ref_count <= counts[name]]
+    decremented = [blob for name, blob in stored.items() if blob.ref_count > counts[name]]
+
+    StoredBlob.objects.filter(bucket=bucket_name, blob_name__in=released).delete()
+
+    if decremented:
+        StoredBlob.objects.filter(pk__in=[blob.pk for blob in decremented]).update(
+            ref_count=F('ref_count') - Case(
+                *[When(pk=blob.pk, then=Value(counts[blob.blob_name])) for blob in decremented],
+                output_field=PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    return [rendition_name(name, size) for name in released for size in SIZES]
+
+def release_blob(bucket_name, blob_name):
+    """
+    Drops one reference to a blob. The object and its renditions are deleted in the
+    background once nothing references them any more.
+
+    Returns:
+        bool: True if the blob was scheduled for deletion.
+    """
+    with transaction.atomic():
+        released = release_blobs(bucket_name, [blob_name])
+        transaction.on_commit(lambda: enqueue_blob_deletions(bucket_name, released))
+
+    return bool(released)
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import Q
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .models import Event, EventContent, Image, ScoredBy, PairwiseComparison, PendingUpload, ResumableUpload
+from .helper import resolve_blob_name
+from .blobs import release_blobs
+from .blob_cleanup import enqueue_blob_deletions
+from .google_cloud_storage.bucket import list_from_gcs
+
+def _raw_delete(queryset):
+    # Plain DELETE ... WHERE: no collector, no per-row signals, nothing loaded into memory
+    return queryset._raw_delete(queryset.db)
+
+def delete_images(event_id, image_ids, bucket_name='pick-pic'):
+    """
+    Deletes images of an event with their votes and comparisons, releasing their blobs.
+
+    Must run inside a transaction. The votes go with their images, so rows are removed
+    with raw DELETEs: no collector and no per-vote score signals. Blobs that are no longer
+    referenced are deleted by the background deleter once the transaction commits.
+
+    Returns:
+        The IDs of the images deleted, i.e. those of image_ids that are in the event.
+    """
+    images = list(
+        EventContent.objects.filter(event_id=event_id, image_id__in=image_ids)
+        .values_list('image_id', 'image__file_name')
+    )
+    deleted_ids = [image_id for image_id, _ in images]
+    if not deleted_ids:
+        return deleted_ids
+
+    _raw_delete(ScoredBy.objects.filter(image_id__in=deleted_ids))
+    _raw_delete(PairwiseComparison.objects.filter(Q(winner_id__in=deleted_ids) | Q(loser_id__in=deleted_ids)))
+    _raw_delete(EventContent.objects.filter(image_id__in=deleted_ids))
+    _raw_delete(Image.objects.filter(image_id__in=deleted_ids))
+
+    released = release_blobs(bucket_name, [resolve_blob_name(file_name) for _, file_name in images])
+    transaction.on_commit(lambda: enqueue_blob_deletions(bucket_name, released))
+
+    return deleted_ids
+
+def purge_event_images(event_id, bucket_name, chunk_size):
+    """Deletes an event's images and their votes and comparisons chunk by chunk, releasing their blobs."""
+    while True:
+        with transaction.atomic():
+            image_ids = list(EventContent.objects.filter(event_id=event_id).values_list('image_id', flat=True)[:chunk_size])
+            if not image_ids:
+                return
+
+            delete_images(event_id, image_ids, bucket_name)
+
+def purge_event_uploads(event_id, bucket_name):
+    """Removes an event's unfinished direct and resumable uploads, including their stored parts."""
+    pending = list(PendingUpload.objects.filter(event_id=event_id).values_list('blob_name', flat=True))
+    enqueue_blob_deletions(bucket_name, pending)
+    _raw_delete(PendingUpload.objects.filter(event_id=event_id))
+
+    for upload in ResumableUpload.objects.filter(event_id=event_id):
+        enqueue_blob_deletions(bucket_name, [part.name for part in list_from_gcs(bucket_name, prefix=upload.part_prefix)])
+    _raw_delete(ResumableUpload.objects.filter(event_id=event_id))
+
+def purge_event(event_id, bucket_name='pick-pic', chunk_size=None):
+    """
+    Deletes a soft-deleted event and everything that belongs to it.
+
+    Rows are removed with raw DELETEs in bounded chunks, each in its own short
+    transaction, so a large event never loads its rows into memory or holds table locks
+    for long. Blobs that are no longer referenced are deleted by the background deleter.
+    The purge can be interrupted and run again safely.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'EVENT_PURGE_CHUNK_SIZE', 500)
+
+    purge_event_images(event_id, bucket_name, chunk_size)
+    purge_event_uploads(event_id, bucket_name)
+
+    # Everything else that points at the event (members, invites, ...), whatever models are added later
+    for relation in Event._meta.related_objects:
+        if relation.related_model in (EventContent, PendingUpload, ResumableUpload):
+            continue
+
+        queryset = relation.related_model.objects.filter(**{relation.field.name: event_id})
+        while True:
+            with transaction.atomic():
+                pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+                if not pks:
+                    break
+                _raw_delete(relation.related_model.objects.filter(pk__in=pks))
+
+    _raw_delete(Event.objects.filter(event_id=event_id, is_deleted=True))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _run_purge(event_id):
+    try:
+        purge_event(event_id)
+    except Exception as e:
+        print(f"Purging event {event_id} failed (purge_deleted_events will retry): {e}")
+    finally:
+        connection.close()
+
+def enqueue_event_purge(event_id):
+    """Purges a soft-deleted event on a background thread."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-purge")
+
+    return _executor.submit(_run_purge, event_id)
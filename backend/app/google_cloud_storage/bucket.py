@@ -1,56 +1,236 @@
 from google.cloud import storage
-import os
+from google.cloud.storage.batch import Batch
+from google.cloud.storage.retry import DEFAULT_RETRY
+from google.api_core.exceptions import NotFound
+from google.auth.transport.requests import AuthorizedSession
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+import google.auth
+import threading
 
-from google.cloud import storage
+from .cache import get_blob_cache
 
 """
 image/jpeg
 image/png
 """
 
-def upload_to_gcs(bucket_name:str, file_bytes: bytes, destination_blob_name:str, content_type:str="image/jpeg"):
-    """Uploads a byte array to the Google Cloud Storage bucket."""
-    # Initialize a client
-    client = storage.Client()
+# Process-wide storage client and bucket handles, shared by every request
+_client = None
+_buckets = {}
+_registry_lock = threading.Lock()
+
+def _build_client():
+    """Builds a storage client backed by a pooled, keep-alive HTTP session."""
+    credentials, project = google.auth.default(scopes=[
+        "https://www.googleapis.com/auth/devstorage.full_control",
+    ])
+
+    pool_size = getattr(settings, "GCS_POOL_SIZE", 32)
+
+    # One adapter per scheme; every connection to storage.googleapis.com is kept alive and reused
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return storage.Client(project=project, credentials=credentials, _http=session)
+
+def get_client():
+    """Returns the shared storage client, creating it on first use."""
+    global _client
+
+    if _client is None:
+        with _registry_lock:
+            if _client is None:
+                _client = _build_client()
+
+    return _client
+
+def get_bucket(bucket_name):
+    """Returns the shared bucket handle for the given bucket name."""
+    bucket = _buckets.get(bucket_name)
+
+    if bucket is None:
+        client = get_client()
+        with _registry_lock:
+            bucket = _buckets.get(bucket_name)
+            if bucket is None:
+                bucket = client.bucket(bucket_name)
+                _buckets[bucket_name] = bucket
 
-    # Get the bucket
-    bucket = client.bucket(bucket_name)
+    return bucket
 
+def get_retry():
+    """Returns the retry policy (exponential backoff) used for storage calls."""
+    return DEFAULT_RETRY.with_delay(
+        initial=getattr(settings, "GCS_RETRY_INITIAL_DELAY", 0.5),
+        maximum=getattr(settings, "GCS_RETRY_MAX_DELAY", 8.0),
+        multiplier=getattr(settings, "GCS_RETRY_MULTIPLIER", 2.0),
+    ).with_timeout(getattr(settings, "GCS_RETRY_TIMEOUT", 30.0))
+
+def upload_to_gcs(bucket_name:str, file_bytes: bytes, destination_blob_name:str, content_type:str="image/jpeg"):
+    """Uploads a byte array to the Google Cloud Storage bucket."""
     # Create a new blob (object) in the bucket
-    blob = bucket.blob(destination_blob_name)
+    blob = get_bucket(bucket_name).blob(destination_blob_name)
 
-    # Upload the byte array
-    blob.upload_from_string(file_bytes, content_type=content_type)
+    # Upload the byte array; the generation precondition makes the upload safe to retry
+    blob.upload_from_string(file_bytes, content_type=content_type, if_generation_match=0, retry=get_retry())
 
 def download_from_gcs(bucket_name, source_blob_name):
-    """Downloads a file from Google Cloud Storage as a byte array."""
-    # Initialize a client
-    client = storage.Client()
+    """Downloads a file from Google Cloud Storage as a byte array, reading through the local disk cache."""
+    cache = get_blob_cache()
 
-    # Get the bucket
-    bucket = client.bucket(bucket_name)
+    if cache is not None:
+        cached = cache.open(bucket_name, source_blob_name)
+        if cached is None:
+            blob = get_blob_from_gcs(bucket_name, source_blob_name)
+            if blob is not None and cache.fill(blob, retry=get_retry()) is not None:
+                cached = cache.open(bucket_name, source_blob_name, record=False)
+
+        if cached is not None:
+            file, _ = cached
+            with file:
+                return file.read()
 
     # Get the blob (object) from the bucket
-    blob = bucket.blob(source_blob_name)
+    blob = get_bucket(bucket_name).blob(source_blob_name)
 
     # Download the file as bytes
-    file_bytes = blob.download_as_bytes()
+    file_bytes = blob.download_as_bytes(retry=get_retry())
 
     return file_bytes  # Returns the content as bytes
 
 def delete_from_gcs(bucket_name, source_blob_name):
     """Delete a file from Google Cloud Storage"""
-    try:
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(source_blob_name)
-
-        generation_match_precondition = None
-        blob.reload()
-        generation_match_precondition = blob.generation
+    cache = get_blob_cache()
+    if cache is not None:
+        cache.invalidate(bucket_name, source_blob_name)
 
-        blob.delete(if_generation_match=generation_match_precondition)
-        
+    try:
+        get_bucket(bucket_name).delete_blob(source_blob_name, retry=get_retry())
+        return True
+    except NotFound:
+        # Already gone
         return True
-    except:
+    except Exception as e:
+        print(f"Failed to delete {source_blob_name}: {e}")
         return False
+
+def get_blob_from_gcs(bucket_name, source_blob_name):
+    """Fetches the metadata of a file in Google Cloud Storage, or None if it does not exist."""
+    return get_bucket(bucket_name).get_blob(source_blob_name, retry=get_retry())
+
+def stream_from_gcs(blob, start=0, end=None, chunk_size=None):
+    """Yields the bytes of a blob in chunks, from start to end (inclusive)."""
+    if chunk_size is None:
+        chunk_size = getattr(settings, "GCS_STREAM_CHUNK_SIZE", 1024 * 1024)
+
+    if end is None:
+        end = blob.size - 1
+
+    # Pin the generation so every chunk comes from the same version of the object
+    position = start
+    while position <= end:
+        chunk_end = min(position + chunk_size - 1, end)
+        yield blob.download_as_bytes(start=position, end=chunk_end, generation=blob.generation, retry=get_retry())
+        position = chunk_end + 1
+
+def upload_file_to_gcs(bucket_name:str, file_obj, destination_blob_name:str, content_type:str="image/jpeg", size=None, overwrite=False):
+    """Uploads a file-like object to the Google Cloud Storage bucket without reading it into memory at once."""
+    # Objects larger than one chunk are sent as a resumable upload, one chunk at a time
+    chunk_size = getattr(settings, "GCS_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+    blob = get_bucket(bucket_name).blob(destination_blob_name, chunk_size=chunk_size)
+
+    # Unless overwriting is expected, refuse to replace an existing object
+    if_generation_match = None if overwrite else 0
+
+    blob.upload_from_file(file_obj, size=size, content_type=content_type, if_generation_match=if_generation_match, retry=get_retry())
+
+def list_from_gcs(bucket_name, prefix=None):
+    """Lists the files in Google Cloud Storage under a prefix, in lexicographic order."""
+    return get_client().list_blobs(bucket_name, prefix=prefix, retry=get_retry())
+
+def compose_in_gcs(bucket_name, source_blob_names, destination_blob_name, content_type=None, intermediate_prefix=None):
+    """
+    Concatenates files in Google Cloud Storage into a new file.
+
+    A single compose request takes at most 32 sources, so longer lists are composed in
+    rounds through intermediate objects named under intermediate_prefix (the caller is
+    responsible for deleting them).
+    """
+    max_sources = 32
+    bucket = get_bucket(bucket_name)
+
+    if intermediate_prefix is None:
+        intermediate_prefix = destination_blob_name + ".compose"
+
+    sources = [bucket.blob(name) for name in source_blob_names]
+    level = 0
+
+    while len(sources) > max_sources:
+        next_sources = []
+        for index in range(0, len(sources), max_sources):
+            group = sources[index:index + max_sources]
+            if len(group) == 1:
+                next_sources.append(group[0])
+                continue
+
+            intermediate = bucket.blob(f"{intermediate_prefix}/{level}-{index // max_sources}")
+            intermediate.compose(group, retry=get_retry())
+            next_sources.append(intermediate)
+
+        sources = next_sources
+        level += 1
+
+    destination = bucket.blob(destination_blob_name)
+    destination.content_type = content_type
+    destination.compose(sources, if_generation_match=0, retry=get_retry())
+
+def copy_in_gcs(bucket_name, source_blob_name, destination_blob_name):
+    """Copies a file to a new name within the bucket (server-side), refusing to overwrite."""
+    bucket = get_bucket(bucket_name)
+    return bucket.copy_blob(bucket.blob(source_blob_name), bucket, destination_blob_name, if_generation_match=0, retry=get_retry())
+
+class _RecordingBatch(Batch):
+    """A batch that keeps the sub-responses finish() returns (one per request, in order) once the with block has sent it."""
+
+    responses = ()
+
+    def finish(self, raise_exception=True):
+        self.responses = super().finish(raise_exception=raise_exception)
+        return self.responses
+
+def delete_many_from_gcs(bucket_name, source_blob_names):
+    """
+    Deletes files from Google Cloud Storage with batch requests of up to 100 deletes each.
+
+    Returns:
+        {blob_name: error} for the deletes that failed; files that were already gone count as deleted.
+    """
+    max_batch_size = 100
+    client = get_client()
+    bucket = get_bucket(bucket_name)
+    cache = get_blob_cache()
+    failures = {}
+
+    for index in range(0, len(source_blob_names), max_batch_size):
+        names = source_blob_names[index:index + max_batch_size]
+
+        if cache is not None:
+            for name in names:
+                cache.invalidate(bucket_name, name)
+
+        try:
+            with _RecordingBatch(client, raise_exception=False) as batch:
+                for name in names:
+                    bucket.delete_blob(name)
+        except Exception as e:
+            failures.update({name: str(e) for name in names})
+            continue
+
+        for name, response in zip(names, batch.responses):
+            if response.status_code >= 300 and response.status_code != 404:
+                failures[name] = f"HTTP {response.status_code}"
+
+    return failures
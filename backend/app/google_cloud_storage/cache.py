@@ -0,0 +1,245 @@
+from django.conf import settings
+from collections import OrderedDict
+import base64
+import os
+import tempfile
+import threading
+import time
+
+class CachedBlob:
+    def __init__(self, key, path, size, updated):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.updated = updated
+
+class DiskBlobCache:
+    """
+    A bounded, content-addressed cache of blobs on local disk.
+
+    Files are stored under their content checksum, so the same bytes are only kept
+    once whatever name they are read through. An in-memory index maps blob names to
+    cached files, which lets a hit skip the storage metadata call entirely.
+
+    The directory may be shared by every worker process on the host: eviction scans
+    the directory and removes the least recently used files (by mtime, refreshed on
+    every hit) until the cache is back under its byte budget. Each process only sees
+    its own fills, so the byte count is re-read from the directory at least every
+    rescan_interval seconds; otherwise N workers could together fill N times the budget.
+    """
+
+    def __init__(self, directory, max_bytes, max_object_size, stats_log_interval=0, rescan_interval=30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_object_size = max_object_size
+        self.stats_log_interval = stats_log_interval
+        self.rescan_interval = rescan_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = self._scan_size()
+        self._scanned_at = time.monotonic()
+
+    @staticmethod
+    def content_key(blob):
+        """Returns the content address of a blob: its MD5, or CRC32C and size for composite objects."""
+        if blob.md5_hash:
+            return base64.b64decode(blob.md5_hash).hex()
+        return f"{base64.b64decode(blob.crc32c).hex()}-{blob.size}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _scan(self):
+        """Yields (path, stat) for every cached file; files removed mid-scan by another process are skipped."""
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                # Dot files are downloads still in progress
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    yield entry.path, entry.stat()
+                except FileNotFoundError:
+                    pass
+
+    def _scan_size(self):
+        return sum(stat.st_size for _, stat in self._scan())
+
+    def open(self, bucket_name, blob_name, record=True):
+        """
+        Opens a cached blob for reading.
+
+        Args:
+            record: Whether the lookup counts as a hit or miss. Pass False when opening
+                a blob just filled after a miss, which was already counted.
+
+        Returns:
+            (file, CachedBlob), or None on a miss. The open file stays readable even if
+            another process evicts it meanwhile.
+        """
+        with self._lock:
+            cached = self._index.get((bucket_name, blob_name))
+            if cached is not None:
+                self._index.move_to_end((bucket_name, blob_name))
+
+        file = None
+        if cached is not None:
+            try:
+                file = open(cached.path, "rb")
+            except FileNotFoundError:
+                with self._lock:
+                    self._index.pop((bucket_name, blob_name), None)
+
+        if file is not None:
+            # mtime is the recency used for eviction across processes
+            os.utime(cached.path)
+
+        if record:
+            self._record(hit=file is not None)
+
+        return (file, cached) if file is not None else None
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            lookups = self.hits + self.misses
+
+        if self.stats_log_interval and lookups % self.stats_log_interval == 0:
+            print(f"Blob cache stats: {self.stats()}")
+
+    def fill(self, blob, retry=None):
+        """
+        Downloads a blob into the cache, unless its content is already cached.
+
+        Returns:
+            CachedBlob, or None if the blob is too large to cache.
+        """
+        if blob.size > self.max_object_size:
+            return None
+
+        key = self.content_key(blob)
+        path = self._path(key)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # Download to a temporary name and rename, so readers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+            try:
+                with os.fdopen(fd, "wb") as temp_file:
+                    blob.download_to_file(temp_file, generation=blob.generation, retry=retry)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+            with self._lock:
+                self._bytes += blob.size
+                stale = time.monotonic() - self._scanned_at >= self.rescan_interval
+
+            if stale:
+                # Pick up what the other processes sharing the directory have added
+                size = self._scan_size()
+                with self._lock:
+                    self._bytes = size
+                    self._scanned_at = time.monotonic()
+
+            with self._lock:
+                over_budget = self._bytes > self.max_bytes
+
+            if over_budget:
+                self.evict()
+
+        cached = CachedBlob(key, path, blob.size, blob.updated)
+        with self._lock:
+            self._index[(blob.bucket.name, blob.name)] = cached
+            self._index.move_to_end((blob.bucket.name, blob.name))
+            while len(self._index) > getattr(settings, "BLOB_CACHE_INDEX_SIZE", 100000):
+                self._index.popitem(last=False)
+
+        return cached
+
+    def evict(self):
+        """Removes least recently used files until the cache is at 90% of its byte budget."""
+        entries = sorted(self._scan(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * 0.9
+
+        evicted = 0
+        for path, stat in entries:
+            if total <= target:
+                break
+
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+            total -= stat.st_size
+            evicted += 1
+
+        with self._lock:
+            self._bytes = total
+            self._scanned_at = time.monotonic()
+            self.evictions += evicted
+
+    def invalidate(self, bucket_name, blob_name):
+        """Drops a blob from the cache, e.g. after it was deleted from storage."""
+        with self._lock:
+            cached = self._index.pop((bucket_name, blob_name), None)
+
+        if cached is not None:
+            try:
+                os.unlink(cached.path)
+                with self._lock:
+                    self._bytes -= cached.size
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Returns this process's lookup counters and the cache's size; logged every stats_log_interval lookups."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "indexed_blobs": len(self._index),
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_blob_cache():
+    """Returns the process-wide disk cache, or None if BLOB_CACHE_ENABLED is off."""
+    global _cache
+
+    if not getattr(settings, "BLOB_CACHE_ENABLED", True):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskBlobCache(
+                    directory=getattr(settings, "BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pickpic-blob-cache")),
+                    max_bytes=getattr(settings, "BLOB_CACHE_MAX_BYTES", 2 * 1024 ** 3),
+                    max_object_size=getattr(settings, "BLOB_CACHE_MAX_OBJECT_SIZE", 32 * 1024 * 1024),
+                    stats_log_interval=getattr(settings, "BLOB_CACHE_STATS_LOG_INTERVAL", 1000),
+                    rescan_interval=getattr(settings, "BLOB_CACHE_RESCAN_INTERVAL", 30),
+                )
+
+    return _cache
@@ -0,0 +1,136 @@
+from google.auth.credentials import Signing
+from google.auth.transport.requests import Request as AuthRequest
+from django.conf import settings
+from collections import OrderedDict
+from datetime import timedelta
+import threading
+import time
+
+from .bucket import get_client, get_bucket
+
+class SignedUrlCache:
+    """
+    A bounded, thread-safe LRU cache of signed URLs.
+
+    An entry is reused until it comes within refresh_margin seconds of expiring,
+    so clients never receive a URL that is about to stop working.
+    """
+
+    def __init__(self, max_entries, refresh_margin):
+        self.max_entries = max_entries
+        self.refresh_margin = refresh_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            url, expires_at = entry
+            if expires_at - self.refresh_margin <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, url, expires_at):
+        with self._lock:
+            self._entries[key] = (url, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bucket_name, blob_name):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == bucket_name and key[1] == blob_name]:
+                del self._entries[key]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_signed_url_cache():
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SignedUrlCache(
+                    max_entries=getattr(settings, "SIGNED_URL_CACHE_SIZE", 10000),
+                    refresh_margin=getattr(settings, "SIGNED_URL_REFRESH_MARGIN", 120),
+                )
+
+    return _cache
+
+def _signing_credentials():
+    """
+    Returns the keyword arguments needed to sign with the client's credentials.
+
+    Service account keys sign locally. Credentials without a private key (e.g. on
+    Cloud Run or GCE) sign through the IAM signBlob API with a fresh access token.
+    """
+    credentials = get_client()._credentials
+
+    if isinstance(credentials, Signing):
+        return {"credentials": credentials}
+
+    if not credentials.valid:
+        credentials.refresh(AuthRequest())
+
+    return {
+        "service_account_email": credentials.service_account_email,
+        "access_token": credentials.token,
+    }
+
+def get_signed_url(bucket_name, blob_name, method="GET", content_type=None, expiration=None):
+    """
+    Returns a V4 signed URL for a blob.
+
+    Read (GET) URLs are cached and reused until they near expiry. Upload URLs are meant
+    for a single upload, so they are always signed fresh and never cached.
+
+    Args:
+        bucket_name: The bucket holding the blob.
+        blob_name: The name of the blob.
+        method: The HTTP method the URL is valid for (GET to read, PUT to upload).
+        content_type: For GET, the Content-Type storage responds with; for PUT,
+            the Content-Type the client must send.
+        expiration: The lifetime of the URL in seconds.
+
+    Returns:
+        (url, expires_at): The signed URL and its expiry as a Unix timestamp.
+    """
+    if expiration is None:
+        expiration = getattr(settings, "SIGNED_URL_EXPIRATION", 900)
+
+    cache = get_signed_url_cache() if method == "GET" else None
+    key = (bucket_name, blob_name, method, content_type, expiration)
+
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    blob = get_bucket(bucket_name).blob(blob_name)
+    expires_at = time.time() + expiration
+
+    kwargs = {}
+    if content_type and method == "GET":
+        kwargs["response_type"] = content_type
+    elif content_type:
+        kwargs["content_type"] = content_type
+
+    url = blob.generate_signed_url(
+        version="v4",
+        expiration=timedelta(seconds=expiration),
+        method=method,
+        **kwargs,
+        **_signing_credentials(),
+    )
+
+    if cache is not None:
+        cache.put(key, url, expires_at)
+    return url, expires_at
@@ -1,10 +1,136 @@
-from firebase_admin import auth
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from collections import OrderedDict
+import secrets
+import threading
+import time
+import uuid
+
+from .models import BlobAlias, Event
+from .tokens import verify_token, get_bearer_token
 
 def getUserFromToken(jwt):
     try:
-        decoded_token = auth.verify_id_token(jwt)
+        decoded_token = verify_token(jwt)
         uid = decoded_token.get("uid")
         print(f"Firebase UID: {uid}")
         return uid
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+def getFirebaseIdFromRequest(request):
+    """
+    Returns the Firebase UID of the caller, or None if the request has no valid token.
+
+    Uses the claims AuthMiddleware attached to the request. Requests the middleware let
+    through without checking (trusted origins) are verified here, through the same cache.
+    """
+    if not hasattr(request, "firebase_uid"):
+        from .middleware import attach_claims
+
+        token = get_bearer_token(request)
+        try:
+            claims = verify_token(token) if token else None
+        except Exception:
+            claims = None
+
+        if claims is None:
+            return None
+        attach_claims(request, claims)
+
+    return request.firebase_uid
+
+def getUserFromRequest(request):
+    """
+    Returns the User making the request, loaded at most once per request.
+
+    Raises:
+        Http404: If the token is missing or invalid, or no User has its Firebase UID.
+    """
+    if getFirebaseIdFromRequest(request) is None or not request.app_user:
+        raise Http404("No User matches the given query.")
+
+    return request.app_user
+
+def get_event_or_404(event_id):
+    """
+    Returns an event that has not been deleted.
+
+    Soft-deleted events are purged in the background, so nothing may be read from or
+    added to them once is_deleted is set.
+
+    Raises:
+        Http404: If there is no such event, or it has been deleted.
+    """
+    return get_object_or_404(Event, event_id=event_id, is_deleted=False)
+
+# Extensions a blob name may end with; other content types get ".bin" so names always fit the 50-character columns
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpeg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/avif": "avif",
+    "image/heic": "heic",
+    "image/heif": "heif",
+    "image/bmp": "bmp",
+    "image/tiff": "tiff",
+    "image/svg+xml": "svg",
+}
+
+def new_blob_name(content_type, digest=None):
+    """
+    Returns a new blob name for an image, e.g. "image/jpeg" -> "3fa9/9f86d081884c7d659a2feaa0c55ad015.jpeg".
+
+    The name is a random shard prefix followed by the content hash (or a random id when
+    the content is not known yet), so writes spread evenly over the bucket's key space
+    instead of piling onto one ever-increasing key range, and concurrent uploads can
+    never collide.
+    """
+    # Map the content type to a known extension (e.g., "image/jpeg" -> ".jpeg")
+    file_extension = "." + IMAGE_EXTENSIONS.get(content_type.split(";")[0].strip().lower(), "bin")
+    shard = secrets.token_hex(2)
+    return f"{shard}/{(digest or uuid.uuid4().hex)[:32]}{file_extension}"
+
+def is_legacy_blob_name(blob_name):
+    """Returns True for the timestamp names (e.g. "20250308015959123456.jpeg") used before sharding."""
+    return bool(blob_name) and "/" not in blob_name
+
+# Legacy name -> (current name, expiry), so lookups for migrated blobs skip the database
+_aliases = OrderedDict()
+_aliases_lock = threading.Lock()
+
+def resolve_blob_name(blob_name):
+    """
+    Returns the current blob name for a file_name, following renames done by migrate_blob_names.
+
+    Renames are cached for the life of the process. A name without an alias is only
+    cached for BLOB_ALIAS_NEGATIVE_TTL seconds, as migrate_blob_names may rename it at
+    any time and then remove the legacy object.
+    """
+    if not is_legacy_blob_name(blob_name):
+        return blob_name
+
+    with _aliases_lock:
+        cached = _aliases.get(blob_name)
+        if cached is not None:
+            resolved, expires_at = cached
+            if expires_at is None or expires_at > time.monotonic():
+                _aliases.move_to_end(blob_name)
+                return resolved
+            del _aliases[blob_name]
+
+    alias = BlobAlias.objects.filter(legacy_name=blob_name).values_list('blob_name', flat=True).first()
+    if alias is not None:
+        cached = (alias, None)
+    else:
+        cached = (blob_name, time.monotonic() + getattr(settings, "BLOB_ALIAS_NEGATIVE_TTL", 60))
+
+    with _aliases_lock:
+        _aliases[blob_name] = cached
+        while len(_aliases) > 10000:
+            _aliases.popitem(last=False)
+
+    return cached[0]
@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db import transaction
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+from .models import EventContent
+
+def _sort_key(entry):
+    # Same order as the (event, -rank) index, ties broken by the row id
+    return (-entry['rank'], entry['content_id'])
+
+class EventBoard:
+    """
+    The highest-ranked images of one event, best first.
+
+    complete is True when the board holds every image of the event; otherwise it holds
+    the top capacity images and anything below its last entry is unknown.
+    """
+
+    def __init__(self, entries, capacity, complete):
+        self.entries = entries
+        self.capacity = capacity
+        self.complete = complete
+        self.built_at = time.monotonic()
+
+    def find(self, image_id):
+        for entry in self.entries:
+            if entry['image_id'] == image_id:
+                return entry
+        return None
+
+class Leaderboard:
+    """
+    A per-event top-K cache of the highest-ranked images.
+
+    Boards are built lazily from the database (an index range scan over (event, -rank))
+    on a miss, then kept up to date incrementally as votes change ranks. Each worker
+    process has its own boards and does not see votes handled by other processes, so
+    boards are also rebuilt after ttl seconds.
+    """
+
+    def __init__(self, capacity=50, ttl=30.0, max_events=1000):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_events = max_events
+        self._boards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def top(self, event_id, k):
+        """Returns up to k entries ({image_id, file_name, owner, score, rank}), best first."""
+        event_id = str(uuid.UUID(str(event_id)))
+
+        with self._lock:
+            board = self._boards.get(event_id)
+            if board is not None and time.monotonic() - board.built_at < self.ttl and (board.complete or k <= len(board.entries)):
+                self._boards.move_to_end(event_id)
+                return [dict(entry) for entry in board.entries[:k]]
+
+        board = self._build(event_id, max(k, self.capacity))
+
+        with self._lock:
+            self._boards[event_id] = board
+            self._boards.move_to_end(event_id)
+            while len(self._boards) > self.max_events:
+                self._boards.popitem(last=False)
+
+            return [dict(entry) for entry in board.entries[:k]]
+
+    def _build(self, event_id, capacity):
+        rows = (
+            EventContent.objects.filter(event_id=event_id)
+            .order_by('-rank', 'pk')
+            .values('pk', 'image_id', 'image__file_name', 'image__owner_id', 'image__score', 'rank')[:capacity + 1]
+        )
+        entries = [
+            self._entry({
+                'content_id': row['pk'],
+                'image_id': row['image_id'],
+                'file_name': row['image__file_name'],
+                'owner_id': row['image__owner_id'],
+                'score': row['image__score'],
+                'rank': row['rank'],
+            })
+            for row in rows
+        ]
+        complete = len(entries) <= capacity
+        return EventBoard(entries[:capacity], capacity, complete)
+
+    @staticmethod
+    def _entry(row):
+        return {
+            'content_id': row['content_id'],
+            'image_id': str(row['image_id']),
+            'file_name': row['file_name'],
+            'owner': str(row['owner_id']),
+            'score': row['score'],
+            'rank': row['rank'],
+        }
+
+    def record_changes(self, rows):
+        """
+        Applies committed rankings ({event_id, content_id, image_id, file_name, owner_id,
+        score, rank} per image) to the cached boards.
+
+        An image that climbs past the last entry of a partial board is inserted; if one
+        falls below it the board is dropped and rebuilt on next read.
+        """
+        if not rows or not self._boards:
+            return
+
+        by_event = {}
+        for row in rows:
+            by_event.setdefault(str(row['event_id']), []).append(self._entry(row))
+
+        with self._lock:
+            for event_id, entries in by_event.items():
+                board = self._boards.get(event_id)
+                if board is None:
+                    continue
+
+                # Images outside a partial board all rank below its last entry
+                floor = _sort_key(board.entries[-1]) if board.entries else None
+                fell = False
+
+                for entry in entries:
+                    current = board.find(entry['image_id'])
+                    if current is not None:
+                        current.update(entry)
+                        fell = fell or (not board.complete and _sort_key(current) > floor)
+                    elif board.complete:
+                        # A complete board that lacks the image is out of date
+                        fell = True
+                    elif _sort_key(entry) < floor:
+                        board.entries.append(entry)
+
+                if fell:
+                    del self._boards[event_id]
+                    continue
+
+                board.entries.sort(key=_sort_key)
+                del board.entries[board.capacity:]
+
+    def invalidate(self, event_id):
+        """Drops an event's board, e.g. after images were added or removed."""
+        with self._lock:
+            self._boards.pop(str(uuid.UUID(str(event_id))), None)
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+def get_leaderboard():
+    global _leaderboard
+
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard(
+                    capacity=getattr(settings, "LEADERBOARD_SIZE", 50),
+                    ttl=getattr(settings, "LEADERBOARD_TTL", 30.0),
+                    max_events=getattr(settings, "LEADERBOARD_MAX_EVENTS", 1000),
+                )
+
+    return _leaderboard
+
+def record_rank_changes(rows):
+    """Updates the cached leaderboards once new rankings (see Leaderboard.record_changes) are committed."""
+    if rows:
+        transaction.on_commit(lambda: get_leaderboard().record_changes(rows))
+
+def invalidate_leaderboard(event_id):
+    """Drops the cached leaderboard of an event once the current transaction commits."""
+    transaction.on_commit(lambda: get_leaderboard().invalidate(event_id))
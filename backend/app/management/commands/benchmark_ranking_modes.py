@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand
+import math
+import random
+import statistics
+
+from app.voting import wilson_lower_bound
+from app.selection import rating_priority
+from app.pairwise import BASE_RATING, elo_update, pick_pair
+
+def true_top(qualities, k):
+    return set(sorted(range(len(qualities)), key=lambda image: -qualities[image])[:k])
+
+def run_votes(qualities, k, max_judgements, stable, rng):
+    """Simulates up/down votes on images chosen by rating_priority. Returns the judgements needed, or None."""
+    target = true_top(qualities, k)
+    upvotes = [0] * len(qualities)
+    downvotes = [0] * len(qualities)
+    streak = 0
+
+    for judgement in range(1, max_judgements + 1):
+        ranks = [wilson_lower_bound(upvotes[image], downvotes[image]) for image in range(len(qualities))]
+        ordered = sorted(range(len(qualities)), key=lambda image: -ranks[image])
+        boundary = ranks[ordered[k - 1]]
+
+        image = max(range(len(qualities)), key=lambda image: rating_priority(upvotes[image], downvotes[image], boundary) + rng.random() * 0.02)
+        if rng.random() < 1 / (1 + math.exp(-qualities[image])):
+            upvotes[image] += 1
+        else:
+            downvotes[image] += 1
+
+        streak = streak + 1 if set(ordered[:k]) == target else 0
+        if streak >= stable:
+            return judgement - stable + 1
+
+    return None
+
+def run_pairwise(qualities, k, max_judgements, stable, elo_k, rng):
+    """Simulates pairwise choices on adaptively picked pairs with Elo updates. Returns the judgements needed, or None."""
+    target = true_top(qualities, k)
+    ratings = [BASE_RATING] * len(qualities)
+    counts = [0] * len(qualities)
+    streak = 0
+
+    for judgement in range(1, max_judgements + 1):
+        first, second = pick_pair([(image, ratings[image], counts[image]) for image in range(len(qualities))], rng=rng)
+
+        if rng.random() < 1 / (1 + math.exp(qualities[second] - qualities[first])):
+            winner, loser = first, second
+        else:
+            winner, loser = second, first
+
+        ratings[winner], ratings[loser] = elo_update(ratings[winner], ratings[loser], elo_k)
+        counts[winner] += 1
+        counts[loser] += 1
+
+        ordered = sorted(range(len(qualities)), key=lambda image: -ratings[image])
+        streak = streak + 1 if set(ordered[:k]) == target else 0
+        if streak >= stable:
+            return judgement - stable + 1
+
+    return None
+
+class Command(BaseCommand):
+    help = "Simulates how many judgements up/down voting and pairwise comparison each need to find an event's top images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=50)
+        parser.add_argument("--top-k", type=int, default=3)
+        parser.add_argument("--trials", type=int, default=20)
+        parser.add_argument("--max-judgements", type=int, default=5000)
+        parser.add_argument("--stable", type=int, default=50, help="Judgements the top K must stay correct for.")
+        parser.add_argument("--spread", type=float, default=1.0, help="Standard deviation of the simulated image qualities.")
+        parser.add_argument("--elo-k", type=float, default=32)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        results = {"vote": [], "pairwise": []}
+
+        for _ in range(options["trials"]):
+            # Qualities are log-odds: of an upvote, or of beating another image by their difference
+            qualities = [rng.gauss(0, options["spread"]) for _ in range(options["images"])]
+
+            results["vote"].append(run_votes(qualities, options["top_k"], options["max_judgements"], options["stable"], rng))
+            results["pairwise"].append(run_pairwise(qualities, options["top_k"], options["max_judgements"], options["stable"], options["elo_k"], rng))
+
+        for mode, judgements in results.items():
+            converged = [count for count in judgements if count is not None]
+            if converged:
+                summary = f"median {statistics.median(converged):.0f}, mean {statistics.mean(converged):.0f}"
+            else:
+                summary = "never"
+            self.stdout.write(f"{mode:>8}: converged in {len(converged)}/{len(judgements)} trials, judgements {summary}")
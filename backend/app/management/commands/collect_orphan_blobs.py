@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from datetime import timedelta
+
+from app.blob_gc import collect_orphan_blobs
+
+class Command(BaseCommand):
+    help = "Reports (or deletes) blobs in the bucket that no Image, User or upload references."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bucket", default="pick-pic")
+        parser.add_argument("--delete", action="store_true", help="Delete the orphans instead of only listing them.")
+        parser.add_argument("--grace-hours", type=float, default=24, help="Ignore blobs younger than this.")
+        parser.add_argument("--workers", type=int, default=4, help="Number of batch delete requests in flight.")
+        parser.add_argument("--quiet", action="store_true", help="Only print the summary.")
+
+    def handle(self, *args, **options):
+        report = None if options["quiet"] else (lambda blob: self.stdout.write(f"{blob.name}\t{blob.size}\t{blob.time_created}"))
+
+        stats = collect_orphan_blobs(
+            options["bucket"],
+            delete=options["delete"],
+            grace=timedelta(hours=options["grace_hours"]),
+            workers=options["workers"],
+            report=report,
+        )
+
+        action = "deleted" if options["delete"] else "found"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {stats['orphans']} orphan blobs ({stats['bytes']} bytes), {stats['failed']} deletes failed; "
+            f"{stats['unreferenced']} unreferenced and {stats['miscounted']} miscounted dedup entries"
+        ))
@@ -0,0 +1,153 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import heapq
+import threading
+
+from app.models import Image, User, BlobAlias, StoredBlob
+from app.helper import new_blob_name, is_legacy_blob_name
+from app.blobs import register_blobs
+from app.blob_gc import sorted_keys
+from app.renditions import RENDITIONS
+from app.google_cloud_storage.bucket import get_blob_from_gcs, stream_from_gcs, copy_in_gcs, delete_from_gcs
+
+class Command(BaseCommand):
+    help = (
+        "Renames blobs with legacy timestamp names to content-hash names, registers them for "
+        "deduplication and records aliases for the old names."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bucket", default="pick-pic")
+        parser.add_argument("--workers", type=int, default=8, help="Number of blobs renamed in parallel.")
+        parser.add_argument("--delete-legacy", action="store_true", help="Delete the old objects once copied.")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the blobs that would be renamed.")
+
+    def legacy_names(self):
+        """
+        Yields every legacy blob name referenced by the database that has not been migrated
+        yet, once each even when both an Image and a User reference it.
+
+        The referenced names and the aliases are streamed in byte order and merge-joined,
+        so memory stays constant.
+        """
+        names = heapq.merge(sorted_keys(Image, "file_name"), sorted_keys(User, "profile_picture"))
+        migrated = sorted_keys(BlobAlias, "legacy_name")
+        next_migrated = next(migrated, None)
+
+        last = None
+        for name in names:
+            if name == last or not is_legacy_blob_name(name):
+                continue
+            last = name
+
+            while next_migrated is not None and next_migrated < name:
+                next_migrated = next(migrated, None)
+
+            if name != next_migrated:
+                yield name
+
+    def discard(self, bucket_name, blob_name, renditions):
+        delete_from_gcs(bucket_name, blob_name)
+        for suffix in renditions:
+            delete_from_gcs(bucket_name, blob_name + suffix)
+
+    def migrate(self, bucket_name, legacy_name, delete_legacy):
+        blob = get_blob_from_gcs(bucket_name, legacy_name)
+        if blob is None:
+            return "missing"
+
+        # Name the copy by its content, like new uploads, so identical images share one blob
+        digest = hashlib.sha256()
+        for chunk in stream_from_gcs(blob):
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        # Existing renditions move with the original; missing ones are generated on demand later
+        renditions = [suffix for suffix in (spec["suffix"] for spec in RENDITIONS.values())
+                      if get_blob_from_gcs(bucket_name, legacy_name + suffix) is not None]
+
+        uploaded = {}
+        if not StoredBlob.objects.filter(bucket=bucket_name, digest=digest).exists():
+            extension = legacy_name.rsplit(".", 1)[-1] if "." in legacy_name else "bin"
+            blob_name = new_blob_name(f"image/{extension}", digest)
+
+            copy_in_gcs(bucket_name, legacy_name, blob_name)
+            for suffix in renditions:
+                copy_in_gcs(bucket_name, legacy_name + suffix, blob_name + suffix)
+            uploaded[digest] = blob_name
+
+        try:
+            with transaction.atomic():
+                references = (
+                    Image.objects.filter(file_name=legacy_name).count()
+                    + User.objects.filter(profile_picture=legacy_name).count()
+                )
+
+                if not references:
+                    # Deleted since it was listed: the copy is not needed
+                    discarded = list(uploaded.values())
+                else:
+                    blob_names, discarded = register_blobs(bucket_name, {digest: references}, uploaded)
+                    if digest not in blob_names:
+                        raise RuntimeError("the stored blob with the same content was deleted meanwhile, retry")
+                    blob_name = blob_names[digest]
+
+                    # Readers that still hold the old name find the blob through the alias
+                    BlobAlias.objects.create(legacy_name=legacy_name, blob_name=blob_name)
+                    Image.objects.filter(file_name=legacy_name).update(file_name=blob_name)
+                    User.objects.filter(profile_picture=legacy_name).update(profile_picture=blob_name)
+        except Exception:
+            for blob_name in uploaded.values():
+                self.discard(bucket_name, blob_name, renditions)
+            raise
+
+        # Our copy lost to the same content registered meanwhile, or is no longer needed
+        for blob_name in discarded:
+            self.discard(bucket_name, blob_name, renditions)
+
+        if not references:
+            return "unreferenced"
+
+        if delete_legacy:
+            delete_from_gcs(bucket_name, legacy_name)
+            for suffix in renditions:
+                delete_from_gcs(bucket_name, legacy_name + suffix)
+
+        return "renamed"
+
+    def handle(self, *args, **options):
+        bucket_name = options["bucket"]
+        counts = {"renamed": 0, "missing": 0, "unreferenced": 0, "failed": 0}
+        counts_lock = threading.Lock()
+
+        if options["dry_run"]:
+            for name in self.legacy_names():
+                self.stdout.write(name)
+            return
+
+        # Bound the number of queued renames so memory stays constant however many blobs there are
+        in_flight = threading.BoundedSemaphore(options["workers"] * 4)
+
+        def run(name):
+            try:
+                result = self.migrate(bucket_name, name, options["delete_legacy"])
+            except Exception as e:
+                self.stderr.write(f"{name}: {e}")
+                result = "failed"
+            finally:
+                in_flight.release()
+
+            with counts_lock:
+                counts[result] += 1
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for name in self.legacy_names():
+                in_flight.acquire()
+                executor.submit(run, name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"renamed {counts['renamed']}, missing {counts['missing']}, "
+            f"unreferenced {counts['unreferenced']}, failed {counts['failed']}"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.models import Event
+from app.event_cleanup import purge_event
+from app.blob_cleanup import get_blob_deleter
+
+class Command(BaseCommand):
+    help = "Purges events that were deleted but not fully removed yet (e.g. a worker restarted mid-purge)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        event_ids = list(Event.objects.filter(is_deleted=True).values_list("event_id", flat=True))
+
+        for event_id in event_ids:
+            purge_event(event_id, chunk_size=options["chunk_size"])
+            self.stdout.write(f"purged {event_id}")
+
+        # Let the queued blob deletions finish before the command exits
+        get_blob_deleter().drain()
+
+        self.stdout.write(self.style.SUCCESS(f"purged {len(event_ids)} events"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from app.models import Image, ScoredBy, EventContent
+from app.voting import rank_of
+
+class Command(BaseCommand):
+    help = "Recomputes every image score, vote count and rank from its ScoredBy rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", help="Only rebuild the images of this event.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        images = Image.objects.all()
+        contents = EventContent.objects.all()
+        if options["event"]:
+            images = images.filter(eventcontent__event_id=options["event"])
+            contents = contents.filter(event_id=options["event"])
+
+        def aggregate(expression, **filters):
+            return Coalesce(Subquery(
+                ScoredBy.objects.filter(image_id=OuterRef('image_id'), **filters)
+                .values('image_id')
+                .annotate(total=expression)
+                .values('total')
+            ), Value(0))
+
+        # The IDs are read first: MySQL rejects an UPDATE whose WHERE selects from the table being updated (error 1093)
+        image_ids = list(images.values_list('pk', flat=True).distinct())
+
+        # One UPDATE ... SET score = (SELECT SUM(score) ...) per batch instead of a save per image
+        updated = 0
+        for start in range(0, len(image_ids), options["batch_size"]):
+            updated += Image.objects.filter(pk__in=image_ids[start:start + options["batch_size"]]).update(
+                score=aggregate(Sum('score')),
+                upvote_count=aggregate(Count('pk'), score=1),
+                downvote_count=aggregate(Count('pk'), score=-1),
+            )
+
+        batch = []
+        ranked = 0
+        for content in contents.select_related('image', 'event').only('pk', 'event__ranking_mode', 'image__upvote_count', 'image__downvote_count', 'image__rating').iterator(chunk_size=options["batch_size"]):
+            content.rank = rank_of({
+                'event__ranking_mode': content.event.ranking_mode,
+                'image__upvote_count': content.image.upvote_count,
+                'image__downvote_count': content.image.downvote_count,
+                'image__rating': content.image.rating,
+            })
+            batch.append(content)
+            if len(batch) == options["batch_size"]:
+                ranked += EventContent.objects.bulk_update(batch, ['rank'])
+                batch = []
+
+        if batch:
+            ranked += EventContent.objects.bulk_update(batch, ['rank'])
+
+        self.stdout.write(self.style.SUCCESS(f"rebuilt the score of {updated} images and the rank of {ranked} event images"))
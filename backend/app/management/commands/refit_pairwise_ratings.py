@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from app.models import Event
+from app.pairwise import refit_event
+
+class Command(BaseCommand):
+    help = "Refits the ratings of pairwise-ranked events from all their comparisons (Bradley-Terry)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", help="Only refit this event.")
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def handle(self, *args, **options):
+        events = Event.objects.filter(ranking_mode='pairwise', is_deleted=False)
+        if options["event"]:
+            events = events.filter(event_id=options["event"])
+
+        for event_id in events.values_list('event_id', flat=True):
+            count = refit_event(event_id, iterations=options["iterations"])
+            self.stdout.write(f"{event_id}: refit {count} images")
+
+        self.stdout.write(self.style.SUCCESS("done"))
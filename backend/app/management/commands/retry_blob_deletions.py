@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from app.models import BlobDeletionFailure
+from app.google_cloud_storage.bucket import delete_many_from_gcs
+
+class Command(BaseCommand):
+    help = "Retries the blob deletions the background deleter gave up on."
+
+    def handle(self, *args, **options):
+        by_bucket = {}
+        for failure in BlobDeletionFailure.objects.all().iterator():
+            by_bucket.setdefault(failure.bucket, []).append(failure.blob_name)
+
+        deleted = 0
+        failed = 0
+
+        for bucket_name, blob_names in by_bucket.items():
+            failures = delete_many_from_gcs(bucket_name, blob_names)
+
+            succeeded = [blob_name for blob_name in blob_names if blob_name not in failures]
+            BlobDeletionFailure.objects.filter(bucket=bucket_name, blob_name__in=succeeded).delete()
+            deleted += len(succeeded)
+
+            for blob_name, error in failures.items():
+                failure = BlobDeletionFailure.objects.get(bucket=bucket_name, blob_name=blob_name)
+                failure.error = error
+                failure.attempts += 1
+                failure.save()
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"deleted {deleted}, still failing {failed}"))
@@ -1,7 +1,8 @@
 from django.conf import settings
 from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
 
-from firebase_admin import auth
+from .tokens import verify_token
 
 SECRET_KEY = settings.SECRET_KEY  # Use Django's secret key
 
@@ -15,6 +16,16 @@ class ExceptionMiddleware:
     def process_exception(self, request, exception):
         return JsonResponse({"error": "Internal server error", "details": str(exception)}, status=500)
 
+def attach_claims(request, claims):
+    """Attaches verified token claims, the Firebase UID and the (lazily loaded) User to the request."""
+    from .models import User
+
+    uid = claims.get("uid")
+    request.firebase_claims = claims
+    request.firebase_uid = uid
+    # Only hits the database if a view actually uses it
+    request.app_user = SimpleLazyObject(lambda: User.objects.filter(firebase_id=uid).first())
+
 class AuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -42,12 +53,14 @@ class AuthMiddleware:
             if scheme.lower() != "bearer":
                 return JsonResponse({"error": "Invalid authentication scheme"}, status=401)
 
-            # Verify Firebase Token
+            # Verify Firebase Token (once per token, views reuse the attached claims)
             try:
-                auth.verify_id_token(token)
+                claims = verify_token(token)
             except:
                 return JsonResponse({"error": "token unauthorized"}, status=401)
 
+            attach_claims(request, claims)
+
         except ValueError:
             return JsonResponse({"error": "Invalid Authorization header format"}, status=401)
 
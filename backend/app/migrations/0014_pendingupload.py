@@ -0,0 +1,25 @@
+# Generated by Django 4.2.18 on 2026-10-18 10:12
+
+import app.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_alter_eventinvite_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingUpload',
+            fields=[
+                ('blob_name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=50)),
+                ('expiration_date', models.DateTimeField(default=app.models.default_upload_expiration)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.event')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.user')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:03
+
+import app.models
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_pendingupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumableUpload',
+            fields=[
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=50)),
+                ('length', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('expiration_date', models.DateTimeField(default=app.models.default_resumable_expiration)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.event')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.user')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.18 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_resumableupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobAlias',
+            fields=[
+                ('legacy_name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('blob_name', models.CharField(max_length=50)),
+            ],
+        ),
+    ]
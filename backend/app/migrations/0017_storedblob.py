@@ -0,0 +1,26 @@
+# Generated by Django 4.2.18 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_blobalias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=63)),
+                ('digest', models.CharField(max_length=64)),
+                ('blob_name', models.CharField(max_length=50, unique=True)),
+                ('ref_count', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'unique_together': {('bucket', 'digest')},
+            },
+        ),
+    ]
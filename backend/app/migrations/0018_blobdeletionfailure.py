@@ -0,0 +1,27 @@
+# Generated by Django 4.2.18 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_storedblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobDeletionFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.CharField(max_length=63)),
+                ('blob_name', models.CharField(max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_attempt', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('bucket', 'blob_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_blobdeletionfailure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
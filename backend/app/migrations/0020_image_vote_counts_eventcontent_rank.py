@@ -0,0 +1,72 @@
+# Generated by Django 4.2.18 on 2026-10-18 17:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+import math
+
+
+def wilson_lower_bound(upvotes, downvotes, z=1.96):
+    n = upvotes + downvotes
+    if n == 0:
+        return 0.0
+    p = upvotes / n
+    return (p + z * z / (2 * n) - z * math.sqrt((p * (1 - p) + z * z / (4 * n)) / n)) / (1 + z * z / n)
+
+
+def backfill_vote_counts(apps, schema_editor):
+    Image = apps.get_model('app', 'Image')
+    ScoredBy = apps.get_model('app', 'ScoredBy')
+    EventContent = apps.get_model('app', 'EventContent')
+
+    def count(score):
+        return Coalesce(Subquery(
+            ScoredBy.objects.filter(image_id=OuterRef('image_id'), score=score)
+            .values('image_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ), Value(0))
+
+    Image.objects.update(upvote_count=count(1), downvote_count=count(-1))
+
+    contents = EventContent.objects.filter(Q(image__upvote_count__gt=0) | Q(image__downvote_count__gt=0))
+    batch = []
+    for content in contents.select_related('image').only('pk', 'image__upvote_count', 'image__downvote_count').iterator(chunk_size=1000):
+        content.rank = wilson_lower_bound(content.image.upvote_count, content.image.downvote_count)
+        batch.append(content)
+        if len(batch) == 1000:
+            EventContent.objects.bulk_update(batch, ['rank'])
+            batch = []
+
+    if batch:
+        EventContent.objects.bulk_update(batch, ['rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_event_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='eventcontent',
+            name='rank',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventcontent',
+            index=models.Index(fields=['event', '-rank'], name='eventcontent_event_rank_idx'),
+        ),
+    ]
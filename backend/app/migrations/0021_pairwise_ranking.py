@@ -0,0 +1,40 @@
+# Generated by Django 4.2.18 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_image_vote_counts_eventcontent_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ranking_mode',
+            field=models.CharField(choices=[('vote', 'Up/down votes'), ('pairwise', 'Pairwise comparisons')], default='vote', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='rating',
+            field=models.FloatField(default=1500),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='comparison_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PairwiseComparison',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.event')),
+                ('loser', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.image')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.user')),
+                ('winner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.image')),
+            ],
+        ),
+    ]
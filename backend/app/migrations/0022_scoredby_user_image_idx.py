@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_pairwise_ranking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scoredby',
+            index=models.Index(fields=['user', 'image'], name='scoredby_user_image_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.18 on 2026-10-18 20:41
+
+from django.db import migrations
+
+
+def pairwise_rank(rating, base_rating=1500.0):
+    return 1 / (1 + 10 ** ((base_rating - rating) / 400))
+
+
+def backfill_pairwise_ranks(apps, schema_editor):
+    EventContent = apps.get_model('app', 'EventContent')
+
+    # Images added to pairwise events kept the vote-mode default rank of 0 until first compared
+    contents = EventContent.objects.filter(event__ranking_mode='pairwise', rank=0)
+    batch = []
+    for content in contents.select_related('image').only('pk', 'image__rating').iterator(chunk_size=1000):
+        content.rank = pairwise_rank(content.image.rating)
+        batch.append(content)
+        if len(batch) == 1000:
+            EventContent.objects.bulk_update(batch, ['rank'])
+            batch = []
+
+    if batch:
+        EventContent.objects.bulk_update(batch, ['rank'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_scoredby_user_image_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pairwise_ranks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.18 on 2026-10-18 22:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_pairwise_initial_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
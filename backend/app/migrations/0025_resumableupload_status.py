@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_storedblob_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumableupload',
+            name='status',
+            field=models.CharField(choices=[('open', 'Receiving chunks'), ('completing', 'Being composed')], default='open', max_length=10),
+        ),
+    ]
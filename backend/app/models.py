@@ -16,11 +16,18 @@ class UserSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
     dark_mode = models.BooleanField(default=False)
 
+RANKING_MODES = [
+    ('vote', 'Up/down votes'),
+    ('pairwise', 'Pairwise comparisons'),
+]
+
 class Event(models.Model):
     event_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     event_name = models.CharField(max_length=255)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     last_modified = models.DateTimeField(auto_now=True)
+    is_deleted = models.BooleanField(default=False)  # set on delete; rows and blobs are purged in the background
+    ranking_mode = models.CharField(max_length=10, choices=RANKING_MODES, default='vote')
 
 def default_expiration():
     return timezone.now() + timedelta(hours=24)
@@ -68,13 +75,21 @@ class Image(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     file_name = models.CharField(max_length=50, blank=True)
     score = models.IntegerField(default=0)
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    rating = models.FloatField(default=1500)  # Elo rating, for events ranked by pairwise comparisons
+    comparison_count = models.PositiveIntegerField(default=0)
 
 class EventContent(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
     image = models.ForeignKey(Image, on_delete=models.CASCADE)
+    rank = models.FloatField(default=0)  # Wilson lower bound of the image's upvote ratio, kept in step with votes
 
     class Meta:
         unique_together = ('event', 'image')
+        indexes = [
+            models.Index(fields=['event', '-rank'], name='eventcontent_event_rank_idx'),
+        ]
 
 class EventUser(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE)
@@ -90,3 +105,69 @@ class ScoredBy(models.Model):
 
     class Meta:
         unique_together = ('image', 'user')
+        indexes = [
+            models.Index(fields=['user', 'image'], name='scoredby_user_image_idx'),
+        ]
+
+def default_upload_expiration():
+    return timezone.now() + timedelta(hours=1)
+
+class PendingUpload(models.Model):  # issued direct-to-storage upload, removed once finalized
+    blob_name = models.CharField(max_length=50, primary_key=True)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    content_type = models.CharField(max_length=50)
+    expiration_date = models.DateTimeField(default=default_upload_expiration)
+
+def default_resumable_expiration():
+    return timezone.now() + timedelta(hours=24)
+
+RESUMABLE_UPLOAD_STATUSES = [
+    ('open', 'Receiving chunks'),
+    ('completing', 'Being composed'),
+]
+
+class ResumableUpload(models.Model):  # in-progress chunked upload, chunks stored as uploads/<upload_id>/<offset>
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    content_type = models.CharField(max_length=50)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    expiration_date = models.DateTimeField(default=default_resumable_expiration)
+    status = models.CharField(max_length=10, choices=RESUMABLE_UPLOAD_STATUSES, default='open')  # claimed by the complete request that composes it
+
+    @property
+    def part_prefix(self):
+        return f"uploads/{self.upload_id}/"
+
+class BlobAlias(models.Model):  # legacy timestamp blob name -> sharded name it was migrated to
+    legacy_name = models.CharField(max_length=50, primary_key=True)
+    blob_name = models.CharField(max_length=50)
+
+class StoredBlob(models.Model):  # dedup index: one object per distinct content, shared by every Image with that content
+    bucket = models.CharField(max_length=63)
+    digest = models.CharField(max_length=64)
+    blob_name = models.CharField(max_length=50, unique=True)
+    ref_count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)  # last ref_count change, so the collector skips counts still in flux
+
+    class Meta:
+        unique_together = ('bucket', 'digest')
+
+class BlobDeletionFailure(models.Model):  # blob the background deleter gave up on, kept for reconciliation
+    bucket = models.CharField(max_length=63)
+    blob_name = models.CharField(max_length=255)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_attempt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('bucket', 'blob_name')
+
+class PairwiseComparison(models.Model):  # one user's choice between two images of a pairwise-ranked event
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    winner = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='+')
+    loser = models.ForeignKey(Image, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
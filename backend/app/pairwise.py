@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+import numpy as np
+import random
+
+from .models import Image, EventContent, PairwiseComparison
+
+# Rating of a newly uploaded image
+BASE_RATING = 1500.0
+
+def expected_score(rating, opponent_rating):
+    """Returns the probability (Elo) that an image rated rating beats one rated opponent_rating."""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def pairwise_rank(rating):
+    """Returns the rank stored for a pairwise-ranked image: its chance of beating a new image."""
+    return expected_score(rating, BASE_RATING)
+
+def elo_update(winner_rating, loser_rating, k):
+    """Returns the (winner, loser) ratings after one comparison."""
+    change = k * (1 - expected_score(winner_rating, loser_rating))
+    return winner_rating + change, loser_rating - change
+
+def pick_pair(images, rng=random, exclude=None, candidates=5):
+    """
+    Picks the next pair of images to compare.
+
+    The first image is the one with the fewest comparisons so far; its opponent is one of
+    the few closest in rating, where the outcome is least predictable and a comparison
+    tells the most.
+
+    Args:
+        images: A list of (image_id, rating, comparison_count).
+        rng: Source of randomness for breaking ties.
+        exclude: Optional callable returning the opponents already compared with an image.
+        candidates: How many of the closest opponents to choose from.
+
+    Returns:
+        tuple: (image_id, image_id), or None with fewer than two images.
+    """
+    if len(images) < 2:
+        return None
+
+    first = min(images, key=lambda image: (image[2], rng.random()))
+    opponents = sorted(
+        (image for image in images if image[0] != first[0]),
+        key=lambda image: (abs(image[1] - first[1]), rng.random()),
+    )[:candidates]
+
+    seen = exclude(first[0]) if exclude is not None else set()
+    fresh = [image for image in opponents if image[0] not in seen] or opponents
+
+    return first[0], rng.choice(fresh)[0]
+
+def choose_pair(event_id, user_id):
+    """Returns the next pair of image IDs for a user to compare in an event, or None."""
+    images = list(
+        Image.objects.filter(eventcontent__event_id=event_id)
+        .values_list('image_id', 'rating', 'comparison_count')
+    )
+
+    def compared_with(image_id):
+        pairs = (
+            PairwiseComparison.objects.filter(event_id=event_id, user_id=user_id)
+            .filter(Q(winner_id=image_id) | Q(loser_id=image_id))
+            .values_list('winner_id', 'loser_id')
+        )
+        return {loser_id if winner_id == image_id else winner_id for winner_id, loser_id in pairs}
+
+    return pick_pair(images, exclude=compared_with)
+
+def next_images_to_compare(event_id, user_id, limit):
+    """
+    Picks the images a user should compare next in a pairwise-ranked event.
+
+    Pairs are drawn one after another with pick_pair from the images not chosen yet, so
+    consecutive images form the pairs whose comparisons tell the most, by rating.
+
+    Returns:
+        list: Up to limit Image objects, owners loaded, in pair order.
+    """
+    images = list(
+        Image.objects.filter(eventcontent__event_id=event_id)
+        .values_list('image_id', 'rating', 'comparison_count')
+    )
+
+    opponents = {}
+    for winner_id, loser_id in PairwiseComparison.objects.filter(event_id=event_id, user_id=user_id).values_list('winner_id', 'loser_id'):
+        opponents.setdefault(winner_id, set()).add(loser_id)
+        opponents.setdefault(loser_id, set()).add(winner_id)
+
+    chosen = []
+    while len(chosen) < limit:
+        pair = pick_pair(images, exclude=lambda image_id: opponents.get(image_id, set()))
+        if pair is None:
+            break
+        chosen.extend(pair)
+        images = [image for image in images if image[0] not in pair]
+    chosen = chosen[:limit]
+
+    loaded = Image.objects.filter(image_id__in=chosen).select_related('owner').in_bulk()
+    return [loaded[image_id] for image_id in chosen if image_id in loaded]
+
+def record_comparison(event_id, user_id, winner_id, loser_id):
+    """
+    Records that a user preferred winner over loser and updates both ratings (Elo).
+
+    Both images are locked in a fixed order, so concurrent comparisons of overlapping
+    pairs serialise instead of deadlocking or losing updates.
+
+    Returns:
+        tuple: The new (winner, loser) ratings.
+    """
+    from .voting import update_ranks
+
+    k = getattr(settings, 'PAIRWISE_ELO_K', 32)
+
+    with transaction.atomic():
+        ratings = dict(
+            Image.objects.select_for_update()
+            .filter(image_id__in=[winner_id, loser_id])
+            .order_by('image_id')
+            .values_list('image_id', 'rating')
+        )
+
+        winner_rating, loser_rating = elo_update(ratings[winner_id], ratings[loser_id], k)
+
+        PairwiseComparison.objects.create(event_id=event_id, user_id=user_id, winner_id=winner_id, loser_id=loser_id)
+        Image.objects.filter(image_id=winner_id).update(rating=winner_rating, comparison_count=F('comparison_count') + 1)
+        Image.objects.filter(image_id=loser_id).update(rating=loser_rating, comparison_count=F('comparison_count') + 1)
+
+        update_ranks([winner_id, loser_id])
+
+    return winner_rating, loser_rating
+
+def bradley_terry(count, winners, losers, iterations=500, tolerance=1e-9, prior=1.0):
+    """
+    Fits Bradley-Terry strengths to a set of comparisons (MM algorithm, vectorised).
+
+    Every item also plays prior virtual games against an item of strength 1, winning
+    half of them, which keeps items with no wins (or no losses) finite and anchors the
+    scale: strength 1 is a rating of BASE_RATING.
+
+    Args:
+        count: Number of items.
+        winners: Array of winner indexes, one per comparison.
+        losers: Array of loser indexes, one per comparison.
+
+    Returns:
+        numpy.ndarray: The strength of each item.
+    """
+    winners = np.asarray(winners, dtype=np.intp)
+    losers = np.asarray(losers, dtype=np.intp)
+
+    wins = np.bincount(winners, minlength=count) + prior / 2
+    strengths = np.ones(count)
+
+    for _ in range(iterations):
+        pair_weights = 1 / (strengths[winners] + strengths[losers])
+        denominators = (
+            np.bincount(winners, weights=pair_weights, minlength=count)
+            + np.bincount(losers, weights=pair_weights, minlength=count)
+            + prior / (strengths + 1)
+        )
+        updated = wins / denominators
+
+        if np.max(np.abs(np.log(updated) - np.log(strengths))) < tolerance:
+            return updated
+        strengths = updated
+
+    return strengths
+
+def strengths_to_ratings(strengths):
+    return BASE_RATING + 400 * np.log10(strengths)
+
+def refit_event(event_id, iterations=500, batch_size=500):
+    """Refits every rating of a pairwise-ranked event from all its comparisons. Returns the number of images."""
+    from .voting import update_ranks
+
+    image_ids = list(EventContent.objects.filter(event_id=event_id).values_list('image_id', flat=True))
+    if not image_ids:
+        return 0
+
+    index = {image_id: position for position, image_id in enumerate(image_ids)}
+    comparisons = [
+        (index[winner_id], index[loser_id])
+        for winner_id, loser_id in PairwiseComparison.objects.filter(event_id=event_id).values_list('winner_id', 'loser_id').iterator()
+        if winner_id in index and loser_id in index
+    ]
+
+    winners = [winner for winner, _ in comparisons]
+    losers = [loser for _, loser in comparisons]
+    ratings = strengths_to_ratings(bradley_terry(len(image_ids), winners, losers, iterations=iterations))
+
+    for start in range(0, len(image_ids), batch_size):
+        with transaction.atomic():
+            batch = [Image(image_id=image_id, rating=float(ratings[index[image_id]])) for image_id in image_ids[start:start + batch_size]]
+            Image.objects.bulk_update(batch, ['rating'])
+            update_ranks([image.image_id for image in batch])
+
+    return len(image_ids)
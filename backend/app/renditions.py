@@ -0,0 +1,130 @@
+from django.conf import settings
+from google.api_core.exceptions import PreconditionFailed
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from PIL import Image as PILImage, ImageOps
+from pillow_heif import register_heif_opener
+import multiprocessing
+import threading
+import io
+
+from .google_cloud_storage.bucket import download_from_gcs, upload_to_gcs, get_blob_from_gcs
+
+# Lets Pillow open the HEIC/HEIF originals uploaded from phones
+register_heif_opener()
+
+"""
+Renditions are stored next to the original as <file_name><suffix>, e.g.
+20250308015959123456.heic -> 20250308015959123456.heic.thumb.jpeg
+"""
+RENDITIONS = {
+    "thumb": {"max_size": 320, "format": "JPEG", "suffix": ".thumb.jpeg", "content_type": "image/jpeg"},
+    "medium": {"max_size": 1280, "format": "JPEG", "suffix": ".medium.jpeg", "content_type": "image/jpeg"},
+    "webp": {"max_size": None, "format": "WEBP", "suffix": ".webp", "content_type": "image/webp"},
+}
+
+SIZES = ("original",) + tuple(RENDITIONS)
+
+def rendition_name(file_name, size):
+    """Returns the blob name of a rendition of an image, or the original's name for size "original"."""
+    if size == "original":
+        return file_name
+    return file_name + RENDITIONS[size]["suffix"]
+
+def render(image, size):
+    """Encodes one rendition of an opened Pillow image and returns its bytes."""
+    spec = RENDITIONS[size]
+    rendition = image.copy()
+
+    if spec["max_size"]:
+        rendition.thumbnail((spec["max_size"], spec["max_size"]), PILImage.Resampling.LANCZOS)
+
+    if spec["format"] == "JPEG" and rendition.mode != "RGB":
+        rendition = rendition.convert("RGB")
+
+    output = io.BytesIO()
+    rendition.save(output, spec["format"], quality=getattr(settings, "RENDITION_QUALITY", 82), optimize=True)
+    return output.getvalue()
+
+def generate_renditions(bucket_name, file_name, sizes=None):
+    """
+    Generates and stores renditions of an image. Runs in the rendition process pool.
+
+    Renditions that already exist are left as they are.
+    """
+    if sizes is None:
+        sizes = tuple(RENDITIONS)
+
+    with PILImage.open(io.BytesIO(download_from_gcs(bucket_name, file_name))) as original:
+        # Apply the EXIF orientation so renditions display the same way as the original
+        image = ImageOps.exif_transpose(original)
+
+        for size in sizes:
+            try:
+                upload_to_gcs(bucket_name, render(image, size), rendition_name(file_name, size), RENDITIONS[size]["content_type"])
+            except PreconditionFailed:
+                pass
+
+    return sizes
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # forkserver: workers start from a clean process rather than a fork of a threaded web worker
+                _executor = ProcessPoolExecutor(
+                    max_workers=getattr(settings, "RENDITION_WORKERS", 2),
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+
+    return _executor
+
+def _log_failure(future):
+    if future.exception() is not None:
+        print(f"Rendition generation failed: {future.exception()}")
+
+def schedule_renditions(bucket_name, file_name):
+    """Queues rendition generation for a newly uploaded image, off the request thread."""
+    future = get_executor().submit(generate_renditions, bucket_name, file_name)
+    future.add_done_callback(_log_failure)
+    return future
+
+# Rendition names known to exist in storage, so repeat reads skip the existence check
+_known_renditions = OrderedDict()
+_known_lock = threading.Lock()
+
+def _remember(blob_name):
+    with _known_lock:
+        _known_renditions[blob_name] = True
+        _known_renditions.move_to_end(blob_name)
+        while len(_known_renditions) > getattr(settings, "RENDITION_KNOWN_CACHE_SIZE", 10000):
+            _known_renditions.popitem(last=False)
+
+def ensure_rendition(bucket_name, file_name, size):
+    """
+    Returns the blob name of a rendition, generating it on demand if it is missing.
+
+    Raises:
+        TimeoutError: Generation did not finish within RENDITION_TIMEOUT seconds.
+    """
+    blob_name = rendition_name(file_name, size)
+
+    if size == "original":
+        return blob_name
+
+    with _known_lock:
+        if blob_name in _known_renditions:
+            _known_renditions.move_to_end(blob_name)
+            return blob_name
+
+    if get_blob_from_gcs(bucket_name, blob_name) is None:
+        future = get_executor().submit(generate_renditions, bucket_name, file_name, (size,))
+        future.result(timeout=getattr(settings, "RENDITION_TIMEOUT", 30))
+
+    _remember(blob_name)
+    return blob_name
@@ -0,0 +1,248 @@
+from django.http import StreamingHttpResponse, FileResponse, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.conf import settings
+from rest_framework import status
+from django.utils.http import http_date
+from datetime import datetime, timezone
+import hashlib
+import mimetypes
+import time
+
+from .google_cloud_storage.bucket import get_blob_from_gcs, stream_from_gcs, get_retry
+from .google_cloud_storage.cache import get_blob_cache
+from .google_cloud_storage.signing import get_signed_url
+
+# How image reads are served: proxied through Django, 302 redirect to a signed URL, or the signed URL as JSON
+READ_MODES = ("proxy", "redirect", "url")
+
+def parse_range_header(range_header, size):
+    """
+    Parses a single-range HTTP Range header.
+
+    Args:
+        range_header: The value of the Range header (e.g. "bytes=0-1023").
+        size: The total size of the resource in bytes.
+
+    Returns:
+        (start, end) inclusive byte offsets, None if the header should be ignored,
+        or False if the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    ranges = range_header[len("bytes="):].split(",")
+
+    # Multiple ranges are allowed to be answered with the full representation
+    if len(ranges) != 1:
+        return None
+
+    first, _, last = ranges[0].strip().partition("-")
+
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start > end:
+        return None
+    if start >= size:
+        return False
+
+    return start, min(end, size - 1)
+
+def guess_content_type(file_name):
+    content_type, _ = mimetypes.guess_type(file_name)
+    if content_type is None:
+        content_type = "application/octet-stream"
+    return content_type
+
+def blob_etag(bucket_name, blob_name):
+    """
+    Returns a strong ETag for a blob.
+
+    Blob names are never reused for different content, so the name alone identifies
+    the bytes and the ETag can be computed without asking storage.
+    """
+    return '"' + hashlib.sha256(f"{bucket_name}/{blob_name}".encode()).hexdigest()[:32] + '"'
+
+def etag_matches(etag, if_none_match):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return etag in candidates
+
+def cache_control(immutable):
+    if immutable:
+        max_age = getattr(settings, "IMAGE_CACHE_MAX_AGE", 31536000)
+        return f"private, max-age={max_age}, immutable"
+    # The URL can point at a different blob later (e.g. a new winner), so clients must revalidate
+    return "private, no-cache"
+
+def not_modified_response(request, etag, immutable):
+    """
+    Returns a 304 response if the client's cached copy is still current, else None.
+
+    If-None-Match takes precedence. For immutable URLs any If-Modified-Since date means
+    the client already holds the only version there will ever be.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+
+    if if_none_match:
+        fresh = etag_matches(etag, if_none_match)
+    else:
+        fresh = immutable and bool(request.headers.get("If-Modified-Since"))
+
+    if not fresh:
+        return None
+
+    response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control(immutable)
+    return response
+
+def stream_file_range(file, start, end, chunk_size=64 * 1024):
+    """Yields bytes start to end (inclusive) of an open file, then closes it."""
+    with file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def get_read_mode(request):
+    """Returns the read mode for a request: the ?mode= query parameter, else IMAGE_READ_MODE."""
+    mode = request.GET.get("mode") or getattr(settings, "IMAGE_READ_MODE", "proxy")
+    return mode if mode in READ_MODES else None
+
+def signed_url_response(bucket_name, blob_name, mode):
+    """Answers an image read with a signed URL instead of the bytes."""
+    url, expires_at = get_signed_url(bucket_name, blob_name, content_type=guess_content_type(blob_name))
+
+    if mode == "url":
+        return JsonResponse({
+            "url": url,
+            "expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat(),
+        }, status=status.HTTP_200_OK)
+
+    response = HttpResponseRedirect(url)
+
+    # Clients may reuse the redirect while the signed URL is still comfortably valid
+    max_age = max(int(expires_at - time.time()) - getattr(settings, "SIGNED_URL_REFRESH_MARGIN", 120), 0)
+    response["Cache-Control"] = f"private, max-age={max_age}"
+    return response
+
+def blob_response(request, bucket_name, blob_name, filename=None, immutable=True):
+    """
+    Serves a blob from storage.
+
+    In proxy mode the blob is streamed to the client with bounded memory per request,
+    with support for single byte-range requests (206 Partial Content). In redirect and
+    url modes the client is sent a short-lived signed URL to fetch the object directly.
+    Conditional requests (If-None-Match, If-Modified-Since) are answered with 304
+    before storage is touched.
+
+    Args:
+        request: The HTTP request object.
+        bucket_name: The bucket holding the blob.
+        blob_name: The name of the blob to serve.
+        filename: Optional filename for the Content-Disposition header.
+        immutable: Whether the request URL always refers to this blob. Immutable
+            responses may be cached by clients for a year without revalidation.
+
+    Returns:
+        HttpResponse: A streaming response, a redirect, a signed URL, 304 or an error.
+    """
+    mode = get_read_mode(request)
+
+    if mode is None:
+        return JsonResponse({"error": f"mode must be one of {', '.join(READ_MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = blob_etag(bucket_name, blob_name)
+
+    not_modified = not_modified_response(request, etag, immutable)
+    if not_modified is not None:
+        return not_modified
+
+    if mode != "proxy":
+        return signed_url_response(bucket_name, blob_name, mode)
+
+    cache = get_blob_cache()
+    cached = cache.open(bucket_name, blob_name) if cache is not None else None
+    blob = None
+
+    if cached is None:
+        blob = get_blob_from_gcs(bucket_name, blob_name)
+
+        if blob is None:
+            return JsonResponse({"error": "image file not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Blobs small enough for the disk cache are downloaded once, then served from disk
+        if cache is not None and cache.fill(blob, retry=get_retry()) is not None:
+            cached = cache.open(bucket_name, blob_name, record=False)
+
+    if cached is not None:
+        file, entry = cached
+        size = entry.size
+        updated = entry.updated
+    else:
+        file = None
+        size = blob.size
+        updated = blob.updated
+
+    content_type = guess_content_type(blob_name)
+
+    # If-Range: only honour the range if the client's partial copy is of this blob
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range.strip() != etag:
+        byte_range = None
+    else:
+        byte_range = parse_range_header(request.headers.get("Range"), size)
+
+    if byte_range is False:
+        if file is not None:
+            file.close()
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        start, end = 0, size - 1
+        response_status = status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        response_status = status.HTTP_206_PARTIAL_CONTENT
+
+    if file is not None and byte_range is None:
+        # A whole cached file goes out through the server's file wrapper (sendfile where available)
+        response = FileResponse(file, content_type=content_type, status=response_status)
+    elif file is not None:
+        response = StreamingHttpResponse(stream_file_range(file, start, end), content_type=content_type, status=response_status)
+    else:
+        response = StreamingHttpResponse(stream_from_gcs(blob, start, end), content_type=content_type, status=response_status)
+
+    if byte_range is not None:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["X-Cache"] = "HIT" if blob is None else "MISS"
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control(immutable)
+    if updated is not None:
+        response["Last-Modified"] = http_date(updated.timestamp())
+
+    if filename:
+        response["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    return response
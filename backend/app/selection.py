@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+import random
+
+from .models import Image, ScoredBy
+from .voting import wilson_interval
+from .leaderboard import get_leaderboard
+
+def rating_priority(upvotes, downvotes, boundary):
+    """
+    Returns how useful one more vote on an image would be.
+
+    That is the width of the image's confidence interval, minus how far the interval is
+    from the top-K boundary: an image with few votes, or one whose interval straddles
+    the boundary, could still move in or out of the top K, while one whose interval
+    lies clearly on one side of it is already decided.
+    """
+    lower, upper = wilson_interval(upvotes, downvotes)
+
+    if boundary is None or lower <= boundary <= upper:
+        distance = 0.0
+    else:
+        distance = min(abs(lower - boundary), abs(upper - boundary))
+
+    return (upper - lower) - distance
+
+def next_images_to_rate(event_id, user_id, limit, top_k=None, exclude=()):
+    """
+    Picks the images a user should rate next in an event.
+
+    Only images the user has not voted on are considered; they are ordered by
+    rating_priority, with a little random jitter so concurrent raters spread their
+    votes over images of similar priority.
+
+    Args:
+        event_id: The event.
+        user_id: The rating user.
+        limit: Number of images to return.
+        top_k: Size of the top set the ranking has to settle (defaults to NEXT_IMAGE_TOP_K).
+        exclude: Image IDs to leave out, e.g. votes still in the write-behind buffer.
+
+    Returns:
+        list: Up to limit Image objects, owners loaded, most useful first.
+    """
+    if top_k is None:
+        top_k = getattr(settings, "NEXT_IMAGE_TOP_K", 5)
+    jitter = getattr(settings, "NEXT_IMAGE_JITTER", 0.02)
+
+    # The lower bound of the K-th best image: crossing it moves an image in or out of the top K
+    top = get_leaderboard().top(event_id, top_k)
+    boundary = top[-1]['rank'] if len(top) == top_k else None
+
+    candidates = (
+        Image.objects.filter(eventcontent__event_id=event_id)
+        .exclude(image_id__in=list(exclude))
+        .filter(~Exists(ScoredBy.objects.filter(image_id=OuterRef('image_id'), user_id=user_id)))
+        .values_list('image_id', 'upvote_count', 'downvote_count')
+    )
+
+    priorities = [
+        (rating_priority(upvotes, downvotes, boundary) + random.random() * jitter, image_id)
+        for image_id, upvotes, downvotes in candidates.iterator()
+    ]
+    priorities.sort(key=lambda item: item[0], reverse=True)
+    chosen = [image_id for _, image_id in priorities[:limit]]
+
+    images = Image.objects.filter(image_id__in=chosen).select_related('owner').in_bulk()
+    return [images[image_id] for image_id in chosen if image_id in images]
@@ -69,6 +69,20 @@ class EventContentSerializer(serializers.ModelSerializer):
         return super().to_representation(instance)["image"]
 
 
+class FeedOwnerSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField(source='image__owner_id')
+    display_name = serializers.CharField(source='image__owner__display_name')
+    email = serializers.EmailField(source='image__owner__email')
+    phone = serializers.CharField(source='image__owner__phone', allow_null=True)
+    profile_picture = serializers.CharField(source='image__owner__profile_picture', allow_null=True)
+
+class FeedImageSerializer(serializers.Serializer):
+    """Serializes EventContent .values() rows in the ImageSerializer shape, without loading model instances."""
+    image_id = serializers.UUIDField()
+    owner = FeedOwnerSerializer(source='*')
+    file_name = serializers.CharField(source='image__file_name')
+    score = serializers.IntegerField(source='image__score')
+
 class ScoredBySerializer(serializers.ModelSerializer):
     image = ImageSerializer()
     user = ClientSideUserSerializer()
@@ -79,7 +93,33 @@ class ScoredBySerializer(serializers.ModelSerializer):
 
 class VoteImageSerializer(serializers.Serializer):
     user_id = serializers.UUIDField()
-    vote = serializers.CharField()
+    vote = serializers.ChoiceField(choices=['upvote', 'downvote'])
+
+class VoteSerializer(serializers.Serializer):
+    image_id = serializers.UUIDField()
+    vote = serializers.ChoiceField(choices=['upvote', 'downvote'])
+
+class VoteBatchSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField()
+    votes = VoteSerializer(many=True, allow_empty=False)
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    image_id = serializers.UUIDField()
+    file_name = serializers.CharField()
+    owner = serializers.UUIDField()
+    score = serializers.IntegerField()
+    lower_bound = serializers.FloatField()
+
+class PairwiseChoiceSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField()
+    winner_id = serializers.UUIDField()
+    loser_id = serializers.UUIDField()
+
+    def validate(self, data):
+        if data['winner_id'] == data['loser_id']:
+            raise serializers.ValidationError("winner_id and loser_id must be different images")
+        return data
 
 class EmailSerializer(serializers.Serializer):
     emails = serializers.ListField(
@@ -93,4 +133,31 @@ class UserListSerializer(serializers.Serializer):
     user_ids = serializers.ListField(
         child=serializers.UUIDField(),
         allow_empty=False
-    )
\ No newline at end of file
+    )
+
+class UploadSessionSerializer(serializers.Serializer):
+    content_types = serializers.ListField(
+        child=serializers.RegexField(r'^image/[\w.+-]+$'),
+        allow_empty=False
+    )
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    blob_names = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False
+    )
+
+class ResumableUploadCreateSerializer(serializers.Serializer):
+    content_type = serializers.RegexField(r'^image/[\w.+-]+$')
+    length = serializers.IntegerField(min_value=1)
+
+class ResumableUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResumableUpload
+        fields = ["upload_id", "content_type", "length", "offset", "expiration_date"]
+
+class ImageIdsSerializer(serializers.Serializer):
+    image_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False
+    )
@@ -1,12 +1,10 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
-from .models import EventContent, ScoredBy
-from django.db.models import Sum
+from .models import ScoredBy
+from .voting import retract_vote
 
-@receiver(post_save, sender=ScoredBy)
+# Votes are applied incrementally by app.voting; a removed vote only needs to be taken back out
 @receiver(post_delete, sender=ScoredBy)
-def update_scored_by_total_vote(sender, instance:ScoredBy, **kwargs):
-    scoredBy = instance
-    image = scoredBy.image
-    image.score = ScoredBy.objects.filter(image_id=image.image_id).aggregate(total=Sum('score'))['total'] or 0
-    image.save()
\ No newline at end of file
+def remove_scored_by_vote(sender, instance:ScoredBy, **kwargs):
+    if instance.score:
+        retract_vote(instance.image_id, instance.score)
@@ -0,0 +1,227 @@
+from django.conf import settings
+from cryptography import x509
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+import firebase_admin
+import requests
+import json
+import re
+import threading
+import time
+import jwt
+
+# Google's public certificates for Firebase ID tokens, rotated every few hours
+CERTIFICATES_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+class UnknownSigningKey(jwt.InvalidTokenError):
+    """The token names a key id that is not in the current key set."""
+
+def parse_public_keys(key_set):
+    """
+    Parses {kid: PEM} into {kid: public key}.
+
+    Accepts both X.509 certificates (the format Google serves) and bare public keys,
+    which is handy for test key sets.
+    """
+    keys = {}
+    for kid, pem in key_set.items():
+        data = pem.encode()
+        if b"BEGIN CERTIFICATE" in data:
+            keys[kid] = x509.load_pem_x509_certificate(data).public_key()
+        else:
+            keys[kid] = load_pem_public_key(data)
+    return keys
+
+def parse_max_age(cache_control, default):
+    """Returns the max-age (seconds) from a Cache-Control header, or default."""
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else default
+
+class SigningKeys:
+    """
+    The current set of token signing keys, refreshed in the background.
+
+    Keys come either from Google's certificate endpoint, refreshed refresh_margin seconds
+    before the advertised max-age runs out, or from a JSON file ({kid: PEM}) that is loaded
+    once and never refreshed (offline tests and benchmarks). Requests only ever read the
+    in-memory key set; a failed refresh keeps the previous keys and retries with backoff.
+
+    Early refreshes (a token named an unknown key id) are ignored within
+    min_refresh_interval seconds of the last fetch, since any client can send such tokens.
+    """
+
+    def __init__(self, url=CERTIFICATES_URL, path=None, refresh_margin=300, timeout=10, min_refresh_interval=60):
+        self.url = url
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def get(self, kid):
+        with self._lock:
+            return self._keys.get(kid)
+
+    @property
+    def loaded(self):
+        with self._lock:
+            return bool(self._keys)
+
+    def load(self):
+        """Loads the key set now. Returns the number of seconds until it should be refreshed."""
+        with self._lock:
+            self._fetched_at = time.monotonic()
+
+        if self.path:
+            with open(self.path) as file:
+                keys = parse_public_keys(json.load(file))
+            max_age = None
+        else:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            keys = parse_public_keys(response.json())
+            max_age = parse_max_age(response.headers.get("Cache-Control"), default=3600)
+
+        with self._lock:
+            self._keys = keys
+            self._expires_at = time.time() + max_age if max_age is not None else float("inf")
+
+        return max_age
+
+    def request_refresh(self):
+        """Asks the background thread to refresh early (e.g. a token used an unknown kid), at most once per min_refresh_interval."""
+        with self._lock:
+            if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.min_refresh_interval:
+                return
+
+        self._wakeup.set()
+
+    def start(self):
+        """
+        Loads keys from the file, or starts the background thread that fetches and refreshes
+        them. Does not wait for the first fetch; until it completes, get_local_verifier
+        returns None and tokens are verified by firebase_admin.
+        """
+        if self.path:
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Failed to load token signing keys: {e}")
+            return
+
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._refresh_loop, name="token-signing-keys", daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self):
+        backoff = 1.0
+
+        while True:
+            with self._lock:
+                delay = self._expires_at - self.refresh_margin - time.time()
+
+            if delay > 0:
+                self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+            try:
+                self.load()
+                backoff = 1.0
+            except Exception as e:
+                print(f"Failed to refresh token signing keys: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+class LocalTokenVerifier:
+    """Verifies Firebase ID tokens with PyJWT against prefetched signing keys, without network I/O."""
+
+    def __init__(self, project_id, keys, leeway=0):
+        self.project_id = project_id
+        self.keys = keys
+        self.leeway = leeway
+
+    def verify(self, token):
+        """
+        Verifies a Firebase ID token the way firebase_admin.auth.verify_id_token does.
+
+        Args:
+            token: The encoded ID token.
+
+        Returns:
+            dict: The decoded claims, with "uid" set to the subject.
+
+        Raises:
+            UnknownSigningKey: If the key id is not in the current key set.
+            jwt.InvalidTokenError: If the token is malformed, expired, or not signed for this project.
+        """
+        header = jwt.get_unverified_header(token)
+
+        key = self.keys.get(header.get("kid"))
+        if key is None:
+            # Google may have rotated keys since the last refresh
+            self.keys.request_refresh()
+            raise UnknownSigningKey(f"token signed with an unknown key: {header.get('kid')}")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=self.project_id,
+            issuer=f"https://securetoken.google.com/{self.project_id}",
+            leeway=self.leeway,
+            options={"require": ["exp", "iat", "sub", "auth_time"]},
+        )
+
+        subject = claims["sub"]
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise jwt.InvalidTokenError("token has an invalid subject")
+
+        if claims["auth_time"] > time.time() + self.leeway:
+            raise jwt.InvalidTokenError("token has an auth_time in the future")
+
+        claims["uid"] = subject
+        return claims
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+def start_local_verifier():
+    """Creates the process-wide local verifier and starts loading its keys. Called on the first verification."""
+    global _verifier
+
+    with _verifier_lock:
+        if _verifier is not None:
+            return _verifier
+
+        project_id = getattr(settings, "FIREBASE_PROJECT_ID", None) or firebase_admin.get_app().project_id
+
+        keys = SigningKeys(
+            path=getattr(settings, "FIREBASE_SIGNING_KEYS_FILE", None),
+            refresh_margin=getattr(settings, "FIREBASE_SIGNING_KEYS_REFRESH_MARGIN", 300),
+            min_refresh_interval=getattr(settings, "FIREBASE_SIGNING_KEYS_MIN_REFRESH_INTERVAL", 60),
+        )
+        keys.start()
+
+        _verifier = LocalTokenVerifier(project_id, keys, leeway=getattr(settings, "FIREBASE_TOKEN_LEEWAY", 0))
+        return _verifier
+
+def get_local_verifier():
+    """
+    Returns the local verifier if FIREBASE_LOCAL_VERIFICATION is on and it has keys, otherwise None.
+
+    The verifier is started on first use rather than at startup, so management commands
+    never fetch keys.
+    """
+    if not getattr(settings, "FIREBASE_LOCAL_VERIFICATION", False):
+        return None
+
+    verifier = _verifier or start_local_verifier()
+    if not verifier.keys.loaded:
+        return None
+    return verifier
@@ -0,0 +1,119 @@
+from django.conf import settings
+from firebase_admin import auth
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from .token_verifier import get_local_verifier, UnknownSigningKey
+
+class TokenCache:
+    """
+    A bounded, thread-safe LRU cache of verified ID token claims.
+
+    Entries are keyed by the SHA-256 of the token (the token itself is never kept) and
+    expire at the token's own "exp" claim, so a cached token is never accepted for longer
+    than Firebase would accept it.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token, claims):
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return
+
+        with self._lock:
+            self._entries[self.key(token)] = (claims, expires_at)
+            self._entries.move_to_end(self.key(token))
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_token_cache():
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TokenCache(max_entries=getattr(settings, "FIREBASE_TOKEN_CACHE_SIZE", 10000))
+
+    return _cache
+
+def verify_token(token):
+    """
+    Verifies a Firebase ID token, reusing the result of an earlier verification of the same token.
+
+    Args:
+        token: The encoded ID token.
+
+    Returns:
+        dict: The decoded claims.
+
+    Raises:
+        Exception: jwt.InvalidTokenError from the local verifier, or whatever firebase_admin
+            raises, for an invalid or expired token.
+    """
+    cache = get_token_cache()
+
+    claims = cache.get(token)
+    if claims is None:
+        claims = _verify(token)
+        cache.put(token, claims)
+
+    return claims
+
+def _verify(token):
+    """Verifies locally when the local verifier has keys, otherwise through firebase_admin."""
+    verifier = get_local_verifier()
+
+    if verifier is not None:
+        try:
+            return verifier.verify(token)
+        except UnknownSigningKey:
+            # Keys were rotated before our refresh, let firebase_admin fetch them this once
+            pass
+
+    return auth.verify_id_token(token)
+
+def get_bearer_token(request):
+    """Returns the token from an "Authorization: Bearer <token>" header, or None."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        return None
+
+    parts = auth_header.split(" ")
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return None
+
+    return parts[1]
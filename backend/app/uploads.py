@@ -0,0 +1,156 @@
+from django.conf import settings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import hashlib
+import tempfile
+import threading
+
+class UploadTooLarge(Exception):
+    pass
+
+class UploadBudgetExhausted(Exception):
+    pass
+
+class MemoryBudget:
+    """
+    A process-wide byte budget for upload data held in memory.
+
+    Requests reserve bytes before reading their body and wait (up to a timeout)
+    while the budget is exhausted, so an upload burst applies backpressure
+    instead of growing the worker's memory without bound.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, amount, timeout=None):
+        # A single reservation larger than the whole budget is capped so it can still proceed alone
+        amount = min(amount, self.limit)
+
+        with self._condition:
+            acquired = self._condition.wait_for(lambda: self.in_use + amount <= self.limit, timeout=timeout)
+            if acquired:
+                self.in_use += amount
+            return acquired
+
+    def release(self, amount):
+        amount = min(amount, self.limit)
+
+        with self._condition:
+            self.in_use -= amount
+            self._condition.notify_all()
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_upload_budget():
+    global _budget
+
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = MemoryBudget(getattr(settings, "UPLOAD_MEMORY_BUDGET", 128 * 1024 * 1024))
+
+    return _budget
+
+def _request_stream(request):
+    # DRF requests expose the raw body stream without buffering it; plain Django requests are file-like
+    if hasattr(request, "stream"):
+        return request.stream
+    return request
+
+@contextmanager
+def spooled_upload(request, max_size=None):
+    """
+    Streams a request body into a spooled temporary file.
+
+    Bodies up to UPLOAD_SPOOL_THRESHOLD stay in memory, larger ones roll over to disk.
+    The in-memory share of the upload is reserved against the process upload budget
+    for as long as the spool is open.
+
+    Args:
+        request: The HTTP request whose body is the uploaded file.
+        max_size: The maximum accepted body size in bytes.
+
+    Yields:
+        (file, size, digest): The rewound spool, the number of bytes read and the
+        SHA-256 hex digest of the body, computed while it streamed in.
+
+    Raises:
+        UploadTooLarge: The body is larger than max_size.
+        UploadBudgetExhausted: No memory budget became available in time.
+    """
+    if max_size is None:
+        max_size = getattr(settings, "IMAGE_UPLOAD_MAX_SIZE", 50 * 1024 * 1024)
+
+    threshold = getattr(settings, "UPLOAD_SPOOL_THRESHOLD", 2621440)
+    upload_chunk_size = getattr(settings, "GCS_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+    read_size = getattr(settings, "UPLOAD_READ_CHUNK_SIZE", 64 * 1024)
+
+    try:
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        content_length = 0
+
+    if content_length > max_size:
+        raise UploadTooLarge(f"upload exceeds {max_size} bytes")
+
+    # Memory held per upload: the in-memory part of the spool plus one storage upload chunk
+    expected = content_length or max_size
+    reservation = min(expected, threshold) + min(expected, upload_chunk_size)
+
+    budget = get_upload_budget()
+    if not budget.acquire(reservation, timeout=getattr(settings, "UPLOAD_BUDGET_TIMEOUT", 10)):
+        raise UploadBudgetExhausted("server is busy with other uploads, retry later")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=threshold)
+    try:
+        stream = _request_stream(request)
+        size = 0
+        digest = hashlib.sha256()
+
+        while stream is not None:
+            chunk = stream.read(read_size)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"upload exceeds {max_size} bytes")
+
+            spool.write(chunk)
+            digest.update(chunk)
+
+        spool.seek(0)
+        yield spool, size, digest.hexdigest()
+    finally:
+        spool.close()
+        budget.release(reservation)
+
+def hash_file(file, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_upload_executor():
+    """Returns the process-wide thread pool for parallel storage writes, shared so concurrency stays bounded."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "BATCH_UPLOAD_WORKERS", 8),
+                    thread_name_prefix="upload",
+                )
+
+    return _executor
@@ -39,11 +39,20 @@ urlpatterns = [
     # custom CRUD endpoints
     path('', include(router.urls)),
 
-    # image/picture endpoints
-    path('event/<str:event_id>/image/<str:image_id>/', views.get_delete_image, name='GET/DELETE Image'),
+    # image/picture endpoints (fixed paths must come before event/<event_id>/image/<image_id>/)
     #path('event/<str:event_id>/image/count/', views.event_image_count, name='Event Image Count'),
     path('event/<str:event_id>/image/highest_score/', views.get_highest_scored_image, name='Get Highest Score Image'),
+    path('event/<str:event_id>/image/upload_session/', views.create_upload_session, name='Create Upload Session'),
+    path('event/<str:event_id>/image/upload_session/finalize/', views.finalize_upload_session, name='Finalize Upload Session'),
+    path('event/<str:event_id>/image/batch/', views.create_images_batch, name='Batch Upload Images'),
+    path('event/<str:event_id>/image/bulk_delete/', views.bulk_delete_images, name='Bulk Delete Images'),
+    path('event/<str:event_id>/image/resumable/', views.create_resumable_upload, name='Create Resumable Upload'),
+    path('event/<str:event_id>/image/resumable/<str:upload_id>/', views.resumable_upload, name='Resumable Upload'),
+    path('event/<str:event_id>/image/resumable/<str:upload_id>/complete/', views.complete_resumable_upload, name='Complete Resumable Upload'),
+    path('event/<str:event_id>/image/vote/', views.vote_images_batch, name='Batch Vote Images'),
+    path('event/<str:event_id>/image/<str:image_id>/', views.get_delete_image, name='GET/DELETE Image'),
     path('event/<str:event_id>/image/user/<str:user_id>/unranked/', views.unranked_images, name='GET unranked images'),
+    path('event/<str:event_id>/image/user/<str:user_id>/next/', views.next_images, name='GET next images to rate'),
     path('event/<str:event_id>/image/', views.create_image, name='PUT Image'),
     
     # upvote/downvote
@@ -52,6 +61,8 @@ urlpatterns = [
     # event
     path('event/create/', views.create_new_event, name='Create New Event'),
     path('event/<str:event_id>/', views.event_info, name='Event Info'),
+    path('event/<str:event_id>/pair/', views.pairwise_comparison, name='Pairwise Comparison'),
+    path('event/<str:event_id>/leaderboard/', views.event_leaderboard, name='Event Leaderboard'),
     path('event/<str:event_id>/content/', views.EventContentViewSet.as_view({'get': 'list'}), name='Event Content'),
     path('event/<str:event_id>/last_modified/', views.event_last_modified, name='Event Last Modified Timestamp'),
 
@@ -8,18 +8,31 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExampl
 
 from .models import User
 
-from django.http import FileResponse
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Exists, OuterRef, F
+from django.utils import timezone
 from rest_framework.request import Request
 
 import uuid
 from .google_cloud_storage.bucket import *
-from datetime import datetime
-import io
-import mimetypes
 
 from .helper import *
+from .responses import blob_response, blob_etag, not_modified_response
+from .google_cloud_storage.signing import get_signed_url
+from .uploads import spooled_upload, hash_file, get_upload_executor, UploadTooLarge, UploadBudgetExhausted
+from .renditions import SIZES, rendition_name, ensure_rendition, schedule_renditions
+from .blobs import store_blob, upload_blobs, register_blobs, release_blob
+from .blob_cleanup import enqueue_blob_deletions
+from .event_cleanup import enqueue_event_purge, delete_images
+from .voting import apply_vote, apply_votes, initial_rank
+from .vote_buffer import get_vote_buffer
+from .leaderboard import get_leaderboard, invalidate_leaderboard
+from .selection import next_images_to_rate
+from .pairwise import choose_pair, next_images_to_compare, record_comparison
 
 # User ViewSet
 class UserViewSet(viewsets.ModelViewSet):
@@ -43,7 +56,7 @@ class EventUserViewSet(viewsets.ModelViewSet):
     lookup_field = "event_id"
     def list(self, request, **kwargs):
         event_id = kwargs.get(self.lookup_field)
-        queryset = self.queryset.filter(event_id=event_id)
+        queryset = self.queryset.filter(event_id=event_id, event__is_deleted=False)
 
         if not queryset.exists():
             return Response(data=[], status=status.HTTP_200_OK)
@@ -76,7 +89,7 @@ class EventContentViewSet(viewsets.ModelViewSet):
 
     def list(self, request, **kwargs):
         event_id = kwargs.get(self.lookup_field)
-        queryset = self.queryset.filter(event_id=event_id)
+        queryset = self.queryset.filter(event_id=event_id, event__is_deleted=False)
 
         sort_param = request.query_params.get("sort")
         if sort_param:
@@ -107,46 +120,50 @@ class ScoredByViewSet(viewsets.ModelViewSet):
 )
 @api_view(['GET'])
 def event_info(request: Request, event_id):
-    event = Event.objects.get(event_id=event_id)
+    event = Event.objects.get(event_id=event_id, is_deleted=False)
     return Response(data=EventSerializer(event).data, status=status.HTTP_200_OK)
 
 # Get or delete an image from an event
 @extend_schema(
     responses={200: {}},
+    parameters=[OpenApiParameter('size', OpenApiTypes.STR, enum=SIZES, description='Rendition to return (default original)')],
 )
 @api_view(['GET', 'DELETE'])
 def get_delete_image(request: Request, event_id=None, image_id=None):
     try:
         if request.method == 'GET':
-            event_exists = Event.objects.filter(event_id=event_id).exists()
+            event_exists = Event.objects.filter(event_id=event_id, is_deleted=False).exists()
 
             if not event_exists:
                 return Response(status=status.HTTP_404_NOT_FOUND, data={ "error":"event-image pair not found" })
 
-            filename = Image.objects.get(image_id=image_id).file_name
+            size = request.GET.get('size', 'original')
 
-            file_bytes = download_from_gcs('pick-pic', filename)
+            if size not in SIZES:
+                return Response(status=status.HTTP_400_BAD_REQUEST, data={ "error": f"size must be one of {', '.join(SIZES)}" })
 
-            file_stream = io.BytesIO(file_bytes)
+            filename = resolve_blob_name(Image.objects.get(image_id=image_id).file_name)
 
-            content_type, _ = mimetypes.guess_type(filename)
-            if content_type is None:
-                content_type = "application/octet-stream"
+            # Answer revalidations before checking for (or generating) the rendition in storage
+            not_modified = not_modified_response(request, blob_etag('pick-pic', rendition_name(filename, size)), immutable=True)
+            if not_modified is not None:
+                return not_modified
 
-            return FileResponse(file_stream, filename=filename, content_type=content_type, status=status.HTTP_200_OK)            
+            blob_name = ensure_rendition('pick-pic', filename, size)
+
+            return blob_response(request, 'pick-pic', blob_name, filename=blob_name)
         elif request.method == 'DELETE':
-                event_exists = Event.objects.filter(event_id=event_id).exists()
+                event_exists = Event.objects.filter(event_id=event_id, is_deleted=False).exists()
 
                 if not event_exists:
                     return Response(status=status.HTTP_404_NOT_FOUND, data={ "error":"event-image pair not found" })
 
-                filename = Image.objects.get(image_id=image_id).file_name
-
-                event_content = EventContent.objects.get(event_id=event_id, image_id=image_id)
-
-                event_content.delete()
-
-                delete_from_gcs('pick-pic', filename)
+                # Same path as the bulk delete: the stored object is only deleted (in the background)
+                # once no other image references the same content
+                with transaction.atomic():
+                    if not delete_images(event_id, [image_id]):
+                        return Response(status=status.HTTP_404_NOT_FOUND, data={ "error":"event-image pair not found" })
+                    invalidate_leaderboard(event_id)
 
                 return Response(status=status.HTTP_202_ACCEPTED, data={})
         else:
@@ -154,6 +171,51 @@ def get_delete_image(request: Request, event_id=None, image_id=None):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Delete many images from an event
+@extend_schema(
+    request=ImageIdsSerializer,
+    responses={202: {}},
+)
+@api_view(['POST'])
+def bulk_delete_images(request: Request, event_id):
+    """
+    Deletes a list of images from an event in one transaction.
+
+    The rows (and the votes on the images) are removed immediately; the stored objects
+    that are no longer referenced are deleted in the background.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A JSON response with the deleted image IDs and the IDs not found in the event.
+    """
+    try:
+        get_event_or_404(event_id)
+
+        serializer = ImageIdsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        image_ids = serializer.validated_data['image_ids']
+
+        max_images = getattr(settings, 'BULK_DELETE_MAX_IMAGES', 500)
+        if len(image_ids) > max_images:
+            return Response(data={'error': f'at most {max_images} images per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            deleted_ids = delete_images(event_id, image_ids)
+            invalidate_leaderboard(event_id)
+
+        not_found = [image_id for image_id in image_ids if image_id not in set(deleted_ids)]
+
+        return Response(status=status.HTTP_202_ACCEPTED, data={'deleted': deleted_ids, 'not_found': not_found})
+    except Http404 as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # Add an image to an event
 
 @extend_schema(
@@ -172,20 +234,14 @@ def create_image(request: Request, event_id=None):
 
     try:
 
-        event = get_object_or_404(Event, event_id=event_id)
+        event = get_event_or_404(event_id)
 
         print(event.event_name)
 
-        firebase_id = getUserFromToken(request.headers.get('Authorization').split(' ')[1])
-
-        user = get_object_or_404(User, firebase_id=firebase_id)
+        user = getUserFromRequest(request)
 
         print(user.display_name)
 
-        file_bytes = request.body
-
-        print(len(file_bytes))
-
         content_type = str(request.headers.get('Content-Type'))
 
         print(content_type)
@@ -196,28 +252,548 @@ def create_image(request: Request, event_id=None):
                 data={"error": f"Unsupported or missing Content-Type header {content_type}"}
             )
 
-        # Extract the extension from the content type (e.g., "image/jpeg" -> ".jpeg")
-        file_extension = "." + content_type.split("/")[-1]
-        unique_name = datetime.now().strftime("%Y%m%d%H%M%S%f") + file_extension
+        # Stream the body into a spooled file (memory below the threshold, disk above) and upload from it
+        with spooled_upload(request) as (file, size, digest):
+            print(size)
 
-        print(unique_name)
+            if size == 0:
+                return Response(status=status.HTTP_400_BAD_REQUEST, data={"error": "empty image body"})
 
-        upload_to_gcs('pick-pic', file_bytes, unique_name, content_type)
+            # Identical content already in the bucket is referenced instead of uploaded again
+            unique_name, created = store_blob('pick-pic', file, size, digest, content_type)
 
         print(unique_name)
 
-        new_image = Image.objects.create(file_name=unique_name, owner=user)
+        try:
+            with transaction.atomic():
+                new_image = Image.objects.create(file_name=unique_name, owner=user)
 
-        print(new_image.image_id)
-        
-        event_content = EventContent.objects.create(
+                print(new_image.image_id)
+
+                event_content = EventContent.objects.create(
+                    event_id=event_id,
+                    image_id=new_image.image_id,
+                    rank=initial_rank(event.ranking_mode),
+                )
+        except Exception:
+            # Nothing references the blob: drop the reference store_blob took
+            release_blob('pick-pic', unique_name)
+            raise
+
+        invalidate_leaderboard(event_id)
+
+        if created:
+            schedule_renditions('pick-pic', unique_name)
+
+        print(event_content)
+
+        return Response(status=status.HTTP_201_CREATED, data=EventContentSerializer(event_content).data)
+    except UploadTooLarge as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except UploadBudgetExhausted as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Issue signed URLs for uploading images straight to storage
+@extend_schema(
+    request=UploadSessionSerializer,
+    responses={201: {}},
+)
+@api_view(['POST'])
+def create_upload_session(request: Request, event_id):
+    """
+    Issues a batch of signed upload URLs so clients can send image bytes directly to storage.
+
+    Each upload must be a PUT of the image to its upload_url with the matching Content-Type,
+    followed by a call to the finalize endpoint with the returned blob names.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A JSON response with one upload slot per requested content type.
+    """
+    try:
+        event = get_event_or_404(event_id)
+
+        user = getUserFromRequest(request)
+
+        serializer = UploadSessionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        content_types = serializer.validated_data['content_types']
+
+        max_batch = getattr(settings, 'UPLOAD_SESSION_MAX_BATCH', 200)
+        if len(content_types) > max_batch:
+            return Response(data={'error': f'at most {max_batch} uploads per session'}, status=status.HTTP_400_BAD_REQUEST)
+
+        pending_uploads = [
+            PendingUpload(blob_name=new_blob_name(content_type), event=event, owner=user, content_type=content_type)
+            for content_type in content_types
+        ]
+        PendingUpload.objects.bulk_create(pending_uploads)
+
+        uploads = []
+        for pending_upload in pending_uploads:
+            upload_url, expires_at = get_signed_url(
+                'pick-pic',
+                pending_upload.blob_name,
+                method='PUT',
+                content_type=pending_upload.content_type,
+                expiration=getattr(settings, 'UPLOAD_SESSION_URL_EXPIRATION', 3600),
+            )
+            uploads.append({
+                'blob_name': pending_upload.blob_name,
+                'content_type': pending_upload.content_type,
+                'upload_url': upload_url,
+                'expires_at': pending_upload.expiration_date,
+            })
+
+        return Response(status=status.HTTP_201_CREATED, data={'uploads': uploads})
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Add images uploaded through an upload session to an event
+@extend_schema(
+    request=UploadFinalizeSerializer,
+    responses={201: {}},
+)
+@api_view(['POST'])
+def finalize_upload_session(request: Request, event_id):
+    """
+    Creates the Image and EventContent rows for uploads that reached storage.
+
+    Blob names that were not issued to the requesting user for this event, have expired,
+    or whose object is not in storage yet are reported back and left untouched, so the
+    client can retry them.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A JSON response with the created images and the blob names still missing.
+    """
+    try:
+        event = get_event_or_404(event_id)
+
+        user = getUserFromRequest(request)
+
+        serializer = UploadFinalizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        blob_names = serializer.validated_data['blob_names']
+
+        pending_uploads = PendingUpload.objects.filter(
+            blob_name__in=blob_names,
             event_id=event_id,
-            image_id=new_image.image_id
+            owner=user,
+            expiration_date__gt=timezone.now(),
         )
 
-        print(event_content)
+        max_size = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+        uploaded = []
+        for pending_upload in pending_uploads:
+            blob = get_blob_from_gcs('pick-pic', pending_upload.blob_name)
+            if blob is not None and blob.size <= max_size:
+                uploaded.append(pending_upload.blob_name)
+
+        with transaction.atomic():
+            # A concurrent finalize of the same uploads waits here, then finds them gone,
+            # so each blob gets exactly one Image
+            claimed = set(
+                PendingUpload.objects.select_for_update()
+                .filter(blob_name__in=uploaded, event_id=event_id, owner=user)
+                .values_list('blob_name', flat=True)
+            )
+            uploaded = [blob_name for blob_name in uploaded if blob_name in claimed]
+            PendingUpload.objects.filter(blob_name__in=uploaded).delete()
+
+            new_images = Image.objects.bulk_create([
+                Image(file_name=blob_name, owner=user) for blob_name in uploaded
+            ])
+            event_contents = EventContent.objects.bulk_create([
+                EventContent(event_id=event_id, image=image, rank=initial_rank(event.ranking_mode)) for image in new_images
+            ])
+            invalidate_leaderboard(event_id)
+
+        for blob_name in uploaded:
+            schedule_renditions('pick-pic', blob_name)
+
+        missing = [blob_name for blob_name in blob_names if blob_name not in uploaded]
+
+        return Response(status=status.HTTP_201_CREATED, data={
+            'images': EventContentSerializer(event_contents, many=True).data,
+            'missing': missing,
+        })
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Add many images to an event in one request
+@extend_schema(
+    request={'multipart/form-data': {'type': 'object', 'properties': {'images': {'type': 'array', 'items': {'type': 'string', 'format': 'binary'}}}}},
+    responses={207: {}},
+)
+@api_view(['POST'])
+def create_images_batch(request: Request, event_id):
+    """
+    Uploads a batch of images, sent as the "images" parts of a multipart request.
+
+    Files are hashed and written to storage concurrently, identical contents are stored
+    once, and all Image/EventContent rows are created in a single transaction.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A 207 response with one result per file, in request order.
+    """
+    try:
+        event = get_event_or_404(event_id)
+
+        user = getUserFromRequest(request)
+
+        # Write every file straight to disk: the default handlers keep each one (up to
+        # FILE_UPLOAD_MAX_MEMORY_SIZE) in memory, outside the upload memory budget
+        request._request.upload_handlers = [TemporaryFileUploadHandler(request._request)]
+
+        files = request.FILES.getlist('images')
+
+        if not files:
+            return Response(data={'error': 'no images in the "images" field'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_files = getattr(settings, 'BATCH_UPLOAD_MAX_FILES', 200)
+        if len(files) > max_files:
+            return Response(data={'error': f'at most {max_files} images per batch'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+        results = [{'index': index, 'name': file.name} for index, file in enumerate(files)]
+
+        valid = []
+        for result, file in zip(results, files):
+            content_type = file.content_type or ''
+            if not content_type.startswith('image/'):
+                result.update(status=status.HTTP_400_BAD_REQUEST, error=f'Unsupported or missing Content-Type {content_type}')
+            elif file.size == 0 or file.size > max_size:
+                result.update(status=status.HTTP_400_BAD_REQUEST, error=f'image must be between 1 and {max_size} bytes')
+            else:
+                valid.append((result, file))
+
+        executor = get_upload_executor()
+
+        # Hash in parallel, then upload each distinct content that is not stored yet
+        digests = list(executor.map(lambda item: hash_file(item[1]), valid))
+
+        uploads = {}
+        reference_counts = {}
+        for digest, (_, file) in zip(digests, valid):
+            uploads.setdefault(digest, (file, file.size, file.content_type))
+            reference_counts[digest] = reference_counts.get(digest, 0) + 1
+
+        uploaded, failed = upload_blobs('pick-pic', uploads, executor)
+
+        try:
+            with transaction.atomic():
+                blob_names, discarded = register_blobs('pick-pic', reference_counts, uploaded)
+
+                created = []
+                for digest, (result, file) in zip(digests, valid):
+                    if digest in blob_names:
+                        created.append((result, Image(file_name=blob_names[digest], owner=user)))
+                    elif digest in failed:
+                        result.update(status=status.HTTP_500_INTERNAL_SERVER_ERROR, error=f'storing the image failed: {failed[digest]}')
+                    else:
+                        result.update(status=status.HTTP_409_CONFLICT, error='stored content was deleted during the upload, retry')
+
+                new_images = Image.objects.bulk_create([image for _, image in created])
+                EventContent.objects.bulk_create([
+                    EventContent(event_id=event_id, image=image, rank=initial_rank(event.ranking_mode)) for image in new_images
+                ])
+                invalidate_leaderboard(event_id)
+        except Exception:
+            # Nothing references the blobs this request stored
+            enqueue_blob_deletions('pick-pic', list(uploaded.values()))
+            raise
+
+        enqueue_blob_deletions('pick-pic', discarded)
+
+        for digest, blob_name in uploaded.items():
+            if blob_name not in discarded:
+                schedule_renditions('pick-pic', blob_name)
+
+        for result, image in created:
+            result.update(status=status.HTTP_201_CREATED, image=ImageSerializer(image).data)
+
+        return Response(status=status.HTTP_207_MULTI_STATUS, data={'results': results})
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Start a resumable (chunked) image upload
+@extend_schema(
+    request=ResumableUploadCreateSerializer,
+    responses={201: ResumableUploadSerializer},
+)
+@api_view(['POST'])
+def create_resumable_upload(request: Request, event_id):
+    """
+    Starts a resumable upload of an image of a known length.
+
+    The client then PATCHes chunks to the returned upload, sending the Upload-Offset
+    header it expects the chunk to start at, can HEAD the upload to find the offset
+    to resume from after a dropped connection, and completes the upload once the
+    whole image has been sent.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A JSON response with the new upload.
+    """
+    try:
+        event = get_event_or_404(event_id)
+
+        user = getUserFromRequest(request)
+
+        serializer = ResumableUploadCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+        if serializer.validated_data['length'] > max_size:
+            return Response(data={'error': f'upload exceeds {max_size} bytes'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        upload = ResumableUpload.objects.create(
+            event=event,
+            owner=user,
+            content_type=serializer.validated_data['content_type'],
+            length=serializer.validated_data['length'],
+        )
+
+        return Response(
+            status=status.HTTP_201_CREATED,
+            data=ResumableUploadSerializer(upload).data,
+            headers={
+                'Location': request.build_absolute_uri(f'{upload.upload_id}/'),
+                'Upload-Offset': str(upload.offset),
+                'Upload-Length': str(upload.length),
+            },
+        )
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Query, append a chunk to, or abort a resumable upload
+@extend_schema(
+    request={'application/offset+octet-stream': OpenApiTypes.BINARY},
+    responses={200: ResumableUploadSerializer, 204: {}},
+    parameters=[OpenApiParameter('Upload-Offset', OpenApiTypes.INT, OpenApiParameter.HEADER)],
+)
+@api_view(['HEAD', 'GET', 'PATCH', 'DELETE'])
+def resumable_upload(request: Request, event_id, upload_id):
+    """
+    HEAD/GET: Returns the current offset of the upload (Upload-Offset header).
+    PATCH: Appends the request body at the offset given by the Upload-Offset header.
+        The offset must match the upload's current offset (409 otherwise), so a
+        chunk is never applied twice or out of order.
+    DELETE: Aborts the upload and removes the chunks stored so far.
+    """
+    try:
+        firebase_id = getFirebaseIdFromRequest(request)
+
+        upload = get_object_or_404(
+            ResumableUpload,
+            upload_id=upload_id,
+            event_id=event_id,
+            event__is_deleted=False,
+            owner__firebase_id=firebase_id,
+            expiration_date__gt=timezone.now(),
+        )
+
+        if request.method in ('HEAD', 'GET'):
+            return Response(
+                status=status.HTTP_200_OK,
+                data=ResumableUploadSerializer(upload).data,
+                headers={'Upload-Offset': str(upload.offset), 'Upload-Length': str(upload.length), 'Cache-Control': 'no-store'},
+            )
+
+        if request.method == 'DELETE':
+            upload.delete()
+            enqueue_blob_deletions('pick-pic', [part.name for part in list_from_gcs('pick-pic', prefix=upload.part_prefix)])
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        try:
+            offset = int(request.headers.get('Upload-Offset'))
+        except (TypeError, ValueError):
+            return Response(data={'error': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_chunk_size = getattr(settings, 'RESUMABLE_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+        if offset != upload.offset:
+            return Response(
+                status=status.HTTP_409_CONFLICT,
+                data={'error': f'expected Upload-Offset {upload.offset}'},
+                headers={'Upload-Offset': str(upload.offset)},
+            )
+
+        # The chunk is read and stored without holding a lock or a transaction open; only
+        # the PATCH that still finds the offset it started from moves it forward
+        with spooled_upload(request, max_size=max_chunk_size) as (file, size, _):
+            if size == 0:
+                return Response(data={'error': 'empty chunk'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if offset + size > upload.length:
+                return Response(data={'error': 'chunk exceeds Upload-Length'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Chunks are named by their start offset; a retried chunk overwrites the failed attempt
+            part_name = f'{upload.part_prefix}{offset:012d}'
+            upload_file_to_gcs('pick-pic', file, part_name, 'application/octet-stream', size=size, overwrite=True)
+
+        advanced = ResumableUpload.objects.filter(upload_id=upload.upload_id, offset=offset).update(offset=offset + size)
+        if not advanced:
+            current = ResumableUpload.objects.filter(upload_id=upload.upload_id).values_list('offset', flat=True).first()
+            if current is None:
+                return Response(data={'error': 'upload was completed or aborted'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(
+                status=status.HTTP_409_CONFLICT,
+                data={'error': f'expected Upload-Offset {current}'},
+                headers={'Upload-Offset': str(current)},
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT, headers={'Upload-Offset': str(offset + size)})
+    except UploadTooLarge as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except UploadBudgetExhausted as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Finish a resumable upload and add the image to the event
+@extend_schema(
+    responses={201: EventContentSerializer},
+)
+@api_view(['POST'])
+def complete_resumable_upload(request: Request, event_id, upload_id):
+    """
+    Composes the uploaded chunks into the final image and adds it to the event.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+        upload_id: The UUID of the resumable upload.
+
+    Returns:
+        Response: The created image, or 409 if the upload is not complete or another
+        request is already completing it.
+    """
+    try:
+        firebase_id = getFirebaseIdFromRequest(request)
+
+        upload = get_object_or_404(
+            ResumableUpload.objects.select_related('event'),
+            upload_id=upload_id,
+            event_id=event_id,
+            event__is_deleted=False,
+            owner__firebase_id=firebase_id,
+        )
+
+        ranking_mode = upload.event.ranking_mode
+
+        # Claim the upload with a single conditional UPDATE: a concurrent complete finds it
+        # claimed and gets a 409, and no lock or transaction is held while composing
+        claimed = ResumableUpload.objects.filter(
+            upload_id=upload.upload_id, status='open', offset=F('length'),
+        ).update(status='completing')
+
+        if not claimed:
+            upload = ResumableUpload.objects.filter(upload_id=upload.upload_id).first()
+            if upload is None:
+                return Response(data={'error': 'upload was completed or aborted'}, status=status.HTTP_404_NOT_FOUND)
+            if upload.status == 'completing':
+                return Response(data={'error': 'upload is already being completed'}, status=status.HTTP_409_CONFLICT)
+            return Response(
+                status=status.HTTP_409_CONFLICT,
+                data={'error': f'upload incomplete, {upload.offset} of {upload.length} bytes received'},
+                headers={'Upload-Offset': str(upload.offset)},
+            )
+
+        try:
+            # Only chunks below the committed offset belong to the upload; anything past it is a failed attempt
+            parts = sorted(
+                (part for part in list_from_gcs('pick-pic', prefix=upload.part_prefix)
+                 if part.name[len(upload.part_prefix):].isdigit()
+                 and int(part.name[len(upload.part_prefix):]) < upload.length),
+                key=lambda part: part.name,
+            )
+
+            error = None
+            expected_offset = 0
+            for part in parts:
+                if int(part.name[len(upload.part_prefix):]) != expected_offset:
+                    error = 'stored chunks are not contiguous'
+                    break
+                expected_offset += part.size
+
+            if error is None and expected_offset != upload.length:
+                error = 'stored chunks do not add up to Upload-Length'
+
+            if error is not None:
+                ResumableUpload.objects.filter(upload_id=upload.upload_id, status='completing').update(status='open')
+                return Response(data={'error': error}, status=status.HTTP_409_CONFLICT)
+
+            unique_name = new_blob_name(upload.content_type)
+
+            compose_in_gcs(
+                'pick-pic',
+                [part.name for part in parts],
+                unique_name,
+                content_type=upload.content_type,
+                intermediate_prefix=f'{upload.part_prefix}compose',
+            )
+        except Exception:
+            # Release the claim so the client can retry
+            ResumableUpload.objects.filter(upload_id=upload.upload_id, status='completing').update(status='open')
+            raise
+
+        try:
+            with transaction.atomic():
+                # The upload may have been aborted while its chunks were composed
+                if not ResumableUpload.objects.filter(upload_id=upload.upload_id, status='completing').delete()[0]:
+                    enqueue_blob_deletions('pick-pic', [unique_name])
+                    return Response(data={'error': 'upload was aborted'}, status=status.HTTP_404_NOT_FOUND)
+
+                new_image = Image.objects.create(file_name=unique_name, owner_id=upload.owner_id)
+                event_content = EventContent.objects.create(event_id=event_id, image=new_image, rank=initial_rank(ranking_mode))
+                invalidate_leaderboard(event_id)
+        except Exception:
+            # Nothing references the composed image; the chunks stay for a retry
+            enqueue_blob_deletions('pick-pic', [unique_name])
+            ResumableUpload.objects.filter(upload_id=upload.upload_id, status='completing').update(status='open')
+            raise
+
+        schedule_renditions('pick-pic', unique_name)
+
+        enqueue_blob_deletions('pick-pic', [part.name for part in list_from_gcs('pick-pic', prefix=upload.part_prefix)])
 
         return Response(status=status.HTTP_201_CREATED, data=EventContentSerializer(event_content).data)
+    except Http404 as e:
+        return Response(data={'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response(data={'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -234,34 +810,27 @@ def user_pfp(request: Request):
 
         if request.method == 'GET':
             
-            file_name = User.objects.get(user_id=user_id).profile_picture
-            
-            file_bytes = download_from_gcs('pick-pic', file_name)
-            file_stream = io.BytesIO(file_bytes)
+            file_name = resolve_blob_name(User.objects.get(user_id=user_id).profile_picture)
 
-            content_type, _ = mimetypes.guess_type(file_name)
-            if content_type is None:
-                content_type = "application/octet-stream"
-
-            return FileResponse(file_stream, content_type=content_type, status=status.HTTP_200_OK)
+            return blob_response(request, 'pick-pic', file_name, immutable=False)
 
         elif request.method == 'PUT':
-            file_bytes = request.body
             content_type = request.headers.get('Content-Type') 
-            unique_name = datetime.now().strftime("%Y%m%d%H%M%S%f")
 
-            if content_type == 'image/jpeg':
-                unique_name += '.jpeg'
-            elif content_type == 'image/png':
-                unique_name += '.png'
-            else:
+            if content_type not in ('image/jpeg', 'image/png'):
                 return Response(status=status.HTTP_400_BAD_REQUEST, data={ "error": "no header - Content-Type" })
 
-            upload_to_gcs('pick-pic', file_bytes, unique_name, content_type)
+            with spooled_upload(request) as (file, size, digest):
+                unique_name = new_blob_name(content_type, digest)
+                upload_file_to_gcs('pick-pic', file, unique_name, content_type, size=size)
 
-            User.objects.get(user_id=user_id).profile_picture = unique_name
+            User.objects.filter(user_id=user_id).update(profile_picture=unique_name)
 
             return Response(status=status.HTTP_201_CREATED)
+    except UploadTooLarge as e:
+        return Response({'error': str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except UploadBudgetExhausted as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'})
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -281,11 +850,11 @@ def event_image_count(request: Request, event_id):
 @api_view(['GET'])
 def list_users_events(request: Request, user_id):
     try:
-        owned_events = Event.objects.filter(owner_id=user_id)
+        owned_events = Event.objects.filter(owner_id=user_id, is_deleted=False)
 
         invited_event_ids = EventUser.objects.filter(user_id=user_id).values_list('event_id', flat=True)
 
-        invited_events = Event.objects.filter(event_id__in=invited_event_ids)
+        invited_events = Event.objects.filter(event_id__in=invited_event_ids, is_deleted=False)
         
         return Response(status=status.HTTP_200_OK ,data={
             "owned_events": EventSerializer(owned_events, many=True).data,
@@ -315,10 +884,14 @@ def create_new_event(request: Request):
 
     user_id = request.data.get('user_id')
     event_name = request.data.get('event_name')
+    ranking_mode = request.data.get('ranking_mode', 'vote')
+
+    if ranking_mode not in dict(RANKING_MODES):
+        return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': f'ranking_mode must be one of {list(dict(RANKING_MODES))}'})
 
     event_owner = User.objects.get(user_id=user_id)
 
-    event = Event.objects.create(event_name=event_name, owner=event_owner)
+    event = Event.objects.create(event_name=event_name, owner=event_owner, ranking_mode=ranking_mode)
 
     EventUser.objects.create(event_id=event.event_id, user_id=user_id)
 
@@ -370,7 +943,7 @@ def add_user_to_event(request: Request, event_id, user_id):
         user_id = uuid.UUID(str(user_id))
 
         # Check if the event and user exist
-        event = Event.objects.get(event_id=event_id)
+        event = Event.objects.get(event_id=event_id, is_deleted=False)
         user = User.objects.get(user_id=user_id)
 
         # Check if the user is already in the event
@@ -434,32 +1007,80 @@ def get_highest_scored_image(request: Request, event_id):
         event_id: The UUID of the event.
 
     Returns:
-        Response: A FileResponse containing the image or an error message.
+        Response: A streaming response containing the image or an error message.
     """
     try:
         event_id = uuid.UUID(str(event_id))
-        
-        # Find the image with the highest score in the event
-        highest_scored_image = Image.objects.filter(
-            eventcontent__event_id=event_id
-        ).order_by('-score').first()
 
-        if not highest_scored_image:
+        # The leaderboard cache does not know about deleted events
+        if not Event.objects.filter(event_id=event_id, is_deleted=False).exists():
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Find the best image in the event (from the cached leaderboard)
+        top = get_leaderboard().top(event_id, 1)
+
+        if not top:
             return Response({'error': 'No images found for this event'}, status=status.HTTP_404_NOT_FOUND)
 
-        file_name = highest_scored_image.file_name
+        file_name = top[0]['file_name']
 
         if not file_name:
           return Response({'error': 'Image file name not set'}, status=status.HTTP_404_NOT_FOUND)
 
-        file_bytes = download_from_gcs('pick-pic', file_name)
-        file_stream = io.BytesIO(file_bytes)
+        return blob_response(request, 'pick-pic', resolve_blob_name(file_name), immutable=False)
 
-        content_type, _ = mimetypes.guess_type(file_name)
-        if content_type is None:
-            content_type = "application/octet-stream"
+    except ValueError:
+        return Response({'error': 'Invalid UUID format'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return FileResponse(file_stream, content_type=content_type, status=status.HTTP_200_OK)
+# Get the highest ranked images of an event
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='k', type=int, location=OpenApiParameter.QUERY, description='Number of images to return (default 10)'),
+    ],
+    responses={200: LeaderboardEntrySerializer(many=True)}
+)
+@api_view(['GET'])
+def event_leaderboard(request: Request, event_id):
+    """
+    Retrieves the k highest ranked images of an event, best first.
+
+    Images are ranked by the Wilson lower bound of their share of upvotes rather than the
+    raw score, so a photo with a few strongly positive votes can beat an early upload
+    that collected many mixed ones.
+
+    Served from the in-memory leaderboard, so scores may lag other workers' votes by a
+    few seconds.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: A JSON list of {rank, image_id, file_name, owner, score, lower_bound}.
+    """
+    try:
+        event_id = uuid.UUID(str(event_id))
+
+        max_k = getattr(settings, 'LEADERBOARD_MAX_K', 100)
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= k <= max_k:
+            return Response({'error': f'k must be between 1 and {max_k}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not Event.objects.filter(event_id=event_id, is_deleted=False).exists():
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        entries = [
+            dict(entry, rank=position, lower_bound=entry['rank'])
+            for position, entry in enumerate(get_leaderboard().top(event_id, k), start=1)
+        ]
+
+        return Response(data=LeaderboardEntrySerializer(entries, many=True).data, status=status.HTTP_200_OK)
 
     except ValueError:
         return Response({'error': 'Invalid UUID format'}, status=status.HTTP_400_BAD_REQUEST)
@@ -476,7 +1097,7 @@ def remove_event_user(request, event_id, user_id):
     Removes a user from an event.
     """
     try:
-        event_user = EventUser.objects.get(event__event_id=event_id, user__user_id=user_id)
+        event_user = EventUser.objects.get(event__event_id=event_id, event__is_deleted=False, user__user_id=user_id)
         event_user.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
     except EventUser.DoesNotExist:
@@ -489,6 +1110,9 @@ def accept_event_user(request, event_id, user_id):
     Changes the 'accepted' status of an EventUser to True.
     """
     try:
+        if not Event.objects.filter(event_id=event_id, is_deleted=False).exists():
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+
         EventUser.objects.get_or_create(event_id=event_id, user_id=user_id)
         return Response({'message': 'Event user accepted successfully.'}, status=status.HTTP_200_OK)
     except EventUser.DoesNotExist:
@@ -514,18 +1138,24 @@ def get_pending_events(request, user_id):
 )
 @api_view(['GET'])
 def event_last_modified(request, event_id):
-    event = Event.objects.filter(event_id=event_id)
-    if not event.exists():
+    event = Event.objects.filter(event_id=event_id, is_deleted=False).first()
+    if event is None:
         return Response(status=status.HTTP_404_NOT_FOUND, data={ "error":"user not found" })
-    return Response(data={"last_modified": Event.objects.get(event_id=event_id).last_modified.strftime("%d/%m/%Y, %H:%M:%S") },
+    return Response(data={"last_modified": event.last_modified.strftime("%d/%m/%Y, %H:%M:%S") },
                     status=status.HTTP_200_OK)
 
 # Delete an event
 @api_view(['DELETE'])
 def user_delete_event(request, user_id, event_id):
     try:
-        event = Event.objects.get(event_id=event_id, owner_id=user_id)
-        event.delete()
+        # Hide the event right away; its rows and blobs are purged in the background
+        with transaction.atomic():
+            deleted = Event.objects.filter(event_id=event_id, owner_id=user_id, is_deleted=False).update(is_deleted=True)
+            if not deleted:
+                raise Event.DoesNotExist()
+            transaction.on_commit(lambda: enqueue_event_purge(event_id))
+            invalidate_leaderboard(event_id)
+
         return Response(status=status.HTTP_202_ACCEPTED)
     except Event.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND, data={ "error":"user does not own this event" })
@@ -533,7 +1163,7 @@ def user_delete_event(request, user_id, event_id):
 @api_view(['DELETE'])
 def remove_user_from_event(request, event_id, user_id):
     try:
-        event_user = EventUser.objects.get(event_id=event_id, user_id=user_id)
+        event_user = EventUser.objects.get(event_id=event_id, event__is_deleted=False, user_id=user_id)
         event_user.delete()
         return Response(status=status.HTTP_202_ACCEPTED)
     except EventUser.DoesNotExist:
@@ -548,15 +1178,13 @@ def remove_user_from_event(request, event_id, user_id):
 def invite_to_event_through_email(request: Request, event_id):
     try:
         # Get the event
-        event = Event.objects.get(event_id=event_id)
+        event = Event.objects.get(event_id=event_id, is_deleted=False)
 
         # Check if the request has multiple user_ids or a single user_id
         emails = request.data.get('emails')
 
         # user requester as inviter
-        firebase_id = getUserFromToken(request.headers.get('Authorization').split(' ')[1])
-
-        inviter = User.objects.get(firebase_id=firebase_id)
+        inviter = getUserFromRequest(request)
 
         for email in emails:
             print(email)
@@ -573,7 +1201,7 @@ def invite_to_event_through_email(request: Request, event_id):
 def force_add_to_event(request: Request, event_id):
     try:
         # Get the event
-        event = Event.objects.get(event_id=event_id)
+        event = Event.objects.get(event_id=event_id, is_deleted=False)
 
         # Check if the request has multiple user_ids or a single user_id
         user_ids = request.data.get('user_ids')
@@ -601,12 +1229,10 @@ def generate_invite_link(request: Request, event_id):
 
     try:
         # Get the event to make sure it exists
-        Event.objects.get(event_id=event_id)
+        Event.objects.get(event_id=event_id, is_deleted=False)
         
         # already verified jwt exist and is valid in middleware
-        firebase_id = getUserFromToken(request.headers.get('Authorization').split(' ')[1])
-
-        inviter = User.objects.get(firebase_id=firebase_id)
+        inviter = getUserFromRequest(request)
 
         # generate invite link
         event_invite = EventInvite.objects.create(event_id=event_id, creator=inviter, link=f'{uuid.uuid4().hex}')
@@ -636,17 +1262,15 @@ def join_via_link(request: Request, event_id):
 
         if request.method == 'GET':
             # Return event details
-            serializer = EventSerializer(Event.objects.get(event_id=event_id))
+            serializer = EventSerializer(Event.objects.get(event_id=event_id, is_deleted=False))
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         elif request.method == 'POST':
             # Get the user from the request
 
-            firebase_id = getUserFromToken(request.headers.get('Authorization').split(' ')[1])
+            user = getUserFromRequest(request)
 
-            user = User.objects.get(firebase_id=firebase_id)
-
-            event = Event.objects.get(event_id=event_id)
+            event = Event.objects.get(event_id=event_id, is_deleted=False)
 
             event_user, _ = EventUser.objects.get_or_create(user=user, event=event)
 
@@ -655,9 +1279,11 @@ def join_via_link(request: Request, event_id):
                 'event': EventSerializer(event_user.event).data
             }, status=status.HTTP_200_OK)
 
+    except Event.DoesNotExist:
+        return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
     except DirectInvite.DoesNotExist:
         return Response({'error': 'Invite link does not exist'}, status=status.HTTP_404_NOT_FOUND)
-    except User.DoesNotExist:
+    except (User.DoesNotExist, Http404):
         return Response({'error': 'User does not exist'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -673,11 +1299,9 @@ def join_via_link(request: Request, event_id):
 def handle_invitation(request: Request, event_id, action):
     try:
         
-        firebase_id = getUserFromToken(request.headers.get('Authorization').split(' ')[1])
-
-        invitee = get_object_or_404(User, firebase_id=firebase_id)
+        invitee = getUserFromRequest(request)
 
-        DirectInvite.objects.get(event_id=event_id, invitee=invitee).delete()
+        DirectInvite.objects.get(event_id=event_id, event__is_deleted=False, invitee=invitee).delete()
 
         if action.lower() == 'accept':
             # Accept the invitation
@@ -689,7 +1313,7 @@ def handle_invitation(request: Request, event_id, action):
         else:
             return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
 
-    except EventUser.DoesNotExist:
+    except (EventUser.DoesNotExist, DirectInvite.DoesNotExist):
         return Response({'error': 'User was not invited to event'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -704,7 +1328,7 @@ def get_pending_event_invitations(request, user_id):
 
         invitee = User.objects.get(user_id=user_id)
         pending_invited_events = DirectInvite.objects.filter(invitee=invitee).values_list('event', flat=True)
-        pending_events = Event.objects.filter(event_id__in=pending_invited_events)
+        pending_events = Event.objects.filter(event_id__in=pending_invited_events, is_deleted=False)
 
         #print(pending_invited_events)
 
@@ -720,45 +1344,283 @@ def get_pending_event_invitations(request, user_id):
 )
 @api_view(['PUT'])
 def vote_image(request: Request, event_id, image_id):
-    user_id = request.data.get("user_id")
-    vote = request.data.get("vote")
+    try:
+        event = get_event_or_404(event_id)
 
-    scoreBy, created = ScoredBy.objects.get_or_create(user_id=user_id, image_id=image_id)
+        if event.ranking_mode == 'pairwise':
+            return Response({'error': 'event is ranked by pairwise comparisons, compare images instead of voting'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if created:
-        scoreBy.score = 0
+        serializer = VoteImageSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user_id = serializer.validated_data['user_id']
+        vote = serializer.validated_data['vote']
+
+        # With the write-behind buffer on, the vote is written with the next flush
+        buffer = get_vote_buffer()
+        if buffer is not None:
+            buffer.record(user_id, image_id, vote)
+        else:
+            apply_vote(user_id, image_id, vote)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    except Http404 as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Vote on many images of an event at once
+@extend_schema(
+    request=VoteBatchSerializer,
+    responses={200: {}}
+)
+@api_view(['POST'])
+def vote_images_batch(request: Request, event_id):
+    """
+    Records a batch of votes by one user, e.g. a swipe-style rating session.
+
+    Args:
+        request: The HTTP request object, with user_id and a list of {image_id, vote}.
+        event_id: The UUID of the event.
+
+    Returns:
+        Response: The user's new score for each image voted on, and the image IDs not in the event.
+    """
+    try:
+        event = get_event_or_404(event_id)
 
-    if vote == 'upvote' and scoreBy.score < 1:
-        scoreBy.score += 1
-    elif vote == 'downvote' and scoreBy.score > -1:
-        scoreBy.score -= 1
+        if event.ranking_mode == 'pairwise':
+            return Response({'error': 'event is ranked by pairwise comparisons, compare images instead of voting'}, status=status.HTTP_400_BAD_REQUEST)
 
-    scoreBy.save()
+        serializer = VoteBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response(status=status.HTTP_204_NO_CONTENT)
+        votes = serializer.validated_data['votes']
+
+        max_votes = getattr(settings, 'VOTE_BATCH_MAX_SIZE', 200)
+        if len(votes) > max_votes:
+            return Response(data={'error': f'at most {max_votes} votes per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        scores, not_found = apply_votes(
+            serializer.validated_data['user_id'],
+            event_id,
+            [(vote['image_id'], vote['vote']) for vote in votes],
+        )
+
+        return Response(status=status.HTTP_200_OK, data={
+            'scores': {str(image_id): score for image_id, score in scores.items()},
+            'not_found': not_found,
+        })
+    except Http404 as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Get the unranked images associated with a user
 @extend_schema(
-    responses={200: EventContentSerializer(many=True)}
+    parameters=[
+        OpenApiParameter(name='after', type=int, location=OpenApiParameter.QUERY, description='Cursor from the X-Next-Cursor header of the previous page'),
+        OpenApiParameter(name='limit', type=int, location=OpenApiParameter.QUERY, description='Page size (default: every image)'),
+    ],
+    responses={200: FeedImageSerializer(many=True)}
 )
 @api_view(['GET'])
 def unranked_images(request: Request, event_id, user_id):
+    """
+    Retrieves the images of an event the user has not voted on yet, a page at a time.
+
+    One anti-join query (NOT EXISTS over the (user, image) index) with the owners joined
+    in; pages are keyed by the event content id, so every page is an index range scan.
+    When more images follow, the X-Next-Cursor header holds the value to pass as after.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+        user_id: The UUID of the user.
+
+    Returns:
+        Response: A JSON list of images.
+    """
+    try:
+        get_event_or_404(event_id)
+
+        after = request.query_params.get('after')
+        limit = request.query_params.get('limit', getattr(settings, 'UNRANKED_DEFAULT_LIMIT', None))
+        max_limit = getattr(settings, 'UNRANKED_MAX_LIMIT', 500)
+
+        try:
+            after = int(after) if after is not None else None
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return Response({'error': 'after and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if limit is not None and not 1 <= limit <= max_limit:
+            return Response({'error': f'limit must be between 1 and {max_limit}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        unranked_images = (
+            EventContent.objects.filter(event_id=event_id)
+            .filter(~Exists(ScoredBy.objects.filter(user_id=user_id, image_id=OuterRef('image_id'))))
+            .order_by('pk')
+        )
+
+        if after is not None:
+            unranked_images = unranked_images.filter(pk__gt=after)
+
+        # Votes still waiting in the write-behind buffer count as ranked for their voter
+        buffer = get_vote_buffer()
+        if buffer is not None:
+            unranked_images = unranked_images.exclude(image_id__in=buffer.pending_for_user(user_id))
+
+        rows = unranked_images.values(
+            'pk', 'image_id', 'image__file_name', 'image__score',
+            'image__owner_id', 'image__owner__display_name', 'image__owner__email',
+            'image__owner__phone', 'image__owner__profile_picture',
+        )
+
+        if limit is None:
+            page = list(rows)
+            has_more = False
+        else:
+            page = list(rows[:limit + 1])
+            has_more = len(page) > limit
+            page = page[:limit]
+
+        response = Response(data=FeedImageSerializer(page, many=True).data, status=status.HTTP_200_OK)
+        if has_more:
+            response['X-Next-Cursor'] = str(page[-1]['pk'])
+        return response
+    except Http404 as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Get the next few images a user should rate
+@extend_schema(
+    parameters=[
+        OpenApiParameter(name='limit', type=int, location=OpenApiParameter.QUERY, description='Number of images to return (default 5)'),
+    ],
+    responses={200: ImageSerializer(many=True)}
+)
+@api_view(['GET'])
+def next_images(request: Request, event_id, user_id):
+    """
+    Retrieves a small batch of unrated images for the user, the ones whose votes help most.
+
+    Images are chosen by how uncertain their rank still is: the fewest or most mixed
+    votes, and intervals around the top-K boundary, come first. In pairwise-ranked
+    events they are chosen by rating instead, consecutive images forming the pairs to
+    compare next.
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event.
+        user_id: The UUID of the rating user.
+
+    Returns:
+        Response: A JSON list of images, most useful first.
+    """
+    try:
+        event = get_event_or_404(event_id)
 
-    event_image_ids = EventContent.objects.filter(event_id=event_id).values_list('image_id', flat=True)
+        max_limit = getattr(settings, 'NEXT_IMAGE_MAX_LIMIT', 50)
+        try:
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 
-    ranked_image_ids = ScoredBy.objects.filter(
-        image_id__in=event_image_ids,
-        user_id=user_id
-    ).values_list('image_id', flat=True)
+        if not 1 <= limit <= max_limit:
+            return Response({'error': f'limit must be between 1 and {max_limit}'}, status=status.HTTP_400_BAD_REQUEST)
 
-    unranked_images = EventContent.objects.filter(
-        event_id=event_id
-    ).exclude(image_id__in=ranked_image_ids)
+        if event.ranking_mode == 'pairwise':
+            images = next_images_to_compare(event_id, user_id, limit)
+            return Response(data=ImageSerializer(images, many=True).data, status=status.HTTP_200_OK)
 
-    return Response(data=EventContentSerializer(unranked_images, many=True).data, status=status.HTTP_200_OK)
+        # Votes still waiting in the write-behind buffer count as ranked for their voter
+        buffer = get_vote_buffer()
+        pending = buffer.pending_for_user(user_id) if buffer is not None else ()
+
+        images = next_images_to_rate(event_id, user_id, limit, exclude=pending)
+
+        return Response(data=ImageSerializer(images, many=True).data, status=status.HTTP_200_OK)
+    except Http404 as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Get the next pair of images to compare, or record which one the user preferred
+@extend_schema(
+    methods=['GET'],
+    parameters=[
+        OpenApiParameter(name='user_id', type=OpenApiTypes.UUID, location=OpenApiParameter.QUERY, description='The comparing user'),
+    ],
+    responses={200: ImageSerializer(many=True)}
+)
+@extend_schema(
+    methods=['POST'],
+    request=PairwiseChoiceSerializer,
+    responses={200: {}}
+)
+@api_view(['GET', 'POST'])
+def pairwise_comparison(request: Request, event_id):
+    """
+    Pairwise ranking: users are shown two images and pick the better one.
+
+    GET returns the next pair for the user, chosen adaptively (the least compared image
+    against an opponent of similar rating). POST records the choice and updates both
+    ratings (Elo); refit_pairwise_ratings refits them in batch (Bradley-Terry).
+
+    Args:
+        request: The HTTP request object.
+        event_id: The UUID of the event, which must use the pairwise ranking mode.
+
+    Returns:
+        Response: GET: a JSON list of the two images. POST: the new ratings.
+    """
+    try:
+        event = Event.objects.filter(event_id=event_id, is_deleted=False).first()
+        if event is None:
+            return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if event.ranking_mode != 'pairwise':
+            return Response({'error': 'event is not ranked by pairwise comparisons'}, status=status.HTTP_409_CONFLICT)
+
+        if request.method == 'GET':
+            user_id = request.query_params.get('user_id')
+            if not user_id:
+                return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            pair = choose_pair(event.event_id, user_id)
+            if pair is None:
+                return Response({'error': 'event needs at least two images'}, status=status.HTTP_404_NOT_FOUND)
+
+            images = Image.objects.filter(image_id__in=pair).select_related('owner').in_bulk()
+            return Response(data=ImageSerializer([images[image_id] for image_id in pair], many=True).data, status=status.HTTP_200_OK)
+
+        serializer = PairwiseChoiceSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        winner_id = serializer.validated_data['winner_id']
+        loser_id = serializer.validated_data['loser_id']
+
+        if EventContent.objects.filter(event=event, image_id__in=[winner_id, loser_id]).count() != 2:
+            return Response({'error': 'both images must belong to the event'}, status=status.HTTP_404_NOT_FOUND)
+
+        winner_rating, loser_rating = record_comparison(event.event_id, serializer.validated_data['user_id'], winner_id, loser_id)
+
+        return Response(status=status.HTTP_200_OK, data={
+            'winner': {'image_id': winner_id, 'rating': winner_rating},
+            'loser': {'image_id': loser_id, 'rating': loser_rating},
+        })
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 def pending_invites(request: Request, event_id):
+    get_event_or_404(event_id)
+
     invites = DirectInvite.objects.filter(event_id=event_id).values_list('invitee', flat=True)
     users = User.objects.filter(user_id__in=invites)
     return Response(data=UserSerializer(users, many=True).data, status=status.HTTP_200_OK)
\ No newline at end of file
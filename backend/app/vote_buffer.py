@@ -0,0 +1,171 @@
+from django.conf import settings
+from django.db import transaction, close_old_connections, IntegrityError, DataError
+import atexit
+import threading
+import uuid
+
+from .models import Image, ScoredBy, User
+from .voting import step_vote, write_scores
+
+# A run of votes is stored as its effect on each possible starting score (-1, 0, 1),
+# so any number of votes by a user on an image coalesces into one entry
+IDENTITY = (-1, 0, 1)
+
+def vote_transform(vote):
+    return tuple(step_vote(score, vote) for score in IDENTITY)
+
+def compose(first, then):
+    """Returns the transform of applying first, then then."""
+    return tuple(then[score + 1] for score in first)
+
+class VoteBuffer:
+    """
+    Buffers votes in memory and writes them behind, in batches.
+
+    Repeated votes by a user on an image are coalesced into one pending entry. The buffer
+    is flushed every flush_interval seconds, as soon as max_pending entries are waiting,
+    and at exit. A flush writes ScoredBy and Image.score for the whole batch in one
+    transaction; scores others see are eventually consistent, and users see their own
+    pending votes through pending_for_user.
+
+    The buffer is per process: pending_for_user only knows the votes this worker took,
+    so a user whose next request lands on another worker may see an image they just
+    voted on until the flush (at most flush_interval seconds later).
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, image_id, vote):
+        key = (str(uuid.UUID(str(user_id))), str(uuid.UUID(str(image_id))))
+
+        with self._lock:
+            self._pending[key] = compose(self._pending.get(key, IDENTITY), vote_transform(vote))
+            full = len(self._pending) >= self.max_pending
+
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def pending_for_user(self, user_id):
+        """Returns the IDs of the images the user has voted on that are not flushed yet."""
+        user_id = str(uuid.UUID(str(user_id)))
+        with self._lock:
+            return {image_id for pending_user_id, image_id in self._pending if pending_user_id == user_id}
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vote-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Vote buffer flush failed: {e}")
+
+    def flush(self):
+        """
+        Writes every pending vote.
+
+        If the batch is rejected (e.g. a user deleted since the vote was recorded), the
+        votes are written one at a time and only those rejected on their own are dropped.
+        On any other failure the votes go back into the buffer.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+
+            if not batch:
+                return 0
+
+            try:
+                close_old_connections()
+                write_buffered_votes(batch)
+            except (IntegrityError, DataError):
+                self._write_one_by_one(batch)
+            except Exception:
+                self._requeue(batch)
+                raise
+
+            return len(batch)
+
+    def _write_one_by_one(self, batch):
+        for position, (key, transform) in enumerate(batch.items()):
+            try:
+                write_buffered_votes({key: transform})
+            except (IntegrityError, DataError) as e:
+                print(f"Dropped buffered vote of user {key[0]} on image {key[1]}: {e}")
+            except Exception:
+                self._requeue(dict(list(batch.items())[position:]))
+                raise
+
+    def _requeue(self, batch):
+        # Newer votes recorded during the flush apply after the ones that failed
+        with self._lock:
+            for key, transform in batch.items():
+                self._pending[key] = compose(transform, self._pending.get(key, IDENTITY))
+
+def write_buffered_votes(batch):
+    """Applies {(user_id, image_id): transform} to ScoredBy and Image.score in one transaction."""
+    image_ids = {image_id for _, image_id in batch}
+    user_ids = {user_id for user_id, _ in batch}
+
+    # Votes on images or by users deleted since they were recorded are dropped
+    existing = {str(image_id) for image_id in Image.objects.filter(image_id__in=image_ids).values_list('image_id', flat=True)}
+    voters = {str(user_id) for user_id in User.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)}
+
+    with transaction.atomic():
+        rows = (
+            ScoredBy.objects.select_for_update()
+            .filter(user_id__in=voters, image_id__in=existing)
+            .values_list('user_id', 'image_id', 'score')
+        )
+        previous = {
+            (str(user_id), str(image_id)): score
+            for user_id, image_id, score in rows
+            if (str(user_id), str(image_id)) in batch
+        }
+
+        scores = {
+            key: transform[previous.get(key, 0) + 1]
+            for key, transform in batch.items()
+            if key[1] in existing and key[0] in voters
+        }
+
+        write_scores(previous, scores)
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_vote_buffer():
+    """Returns the process-wide vote buffer, or None unless VOTE_BUFFER_ENABLED is set."""
+    global _buffer
+
+    if not getattr(settings, "VOTE_BUFFER_ENABLED", False):
+        return None
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = VoteBuffer(
+                    flush_interval=getattr(settings, "VOTE_BUFFER_FLUSH_INTERVAL", 2.0),
+                    max_pending=getattr(settings, "VOTE_BUFFER_MAX_PENDING", 1000),
+                )
+                atexit.register(_buffer.flush)
+
+    return _buffer
@@ -0,0 +1,239 @@
+from django.db import transaction, connection
+from django.db.models import F, Case, When, Value, IntegerField, FloatField
+import math
+
+from .models import Image, ScoredBy, EventContent
+from .leaderboard import record_rank_changes
+from .pairwise import pairwise_rank, BASE_RATING
+
+VOTES = ("upvote", "downvote")
+
+# z for a 95% confidence interval
+RANK_CONFIDENCE_Z = 1.96
+
+def step_vote(score, vote):
+    """
+    Returns a user's score for an image after a vote.
+
+    A vote moves the score one step towards its direction, within [-1, 1], so an
+    upvote after a downvote cancels it rather than flipping it.
+    """
+    if vote == "upvote":
+        return min(score + 1, 1)
+    if vote == "downvote":
+        return max(score - 1, -1)
+    return score
+
+def vote_change(old, new):
+    """Returns the (score, upvote_count, downvote_count) change of an image when a user's score goes from old to new."""
+    return (new - old, (new == 1) - (old == 1), (new == -1) - (old == -1))
+
+def wilson_interval(upvotes, downvotes, z=RANK_CONFIDENCE_Z):
+    """
+    Returns the Wilson score interval (lower, upper) for an image's share of upvotes.
+
+    Unlike the raw score, the lower bound does not reward an image just for having
+    collected more votes: it only rises when the votes it has are mostly positive.
+    An image without votes gets (0, 1).
+    """
+    n = upvotes + downvotes
+    if n == 0:
+        return 0.0, 1.0
+
+    p = upvotes / n
+    centre = p + z * z / (2 * n)
+    margin = z * math.sqrt((p * (1 - p) + z * z / (4 * n)) / n)
+    denominator = 1 + z * z / n
+    return max(0.0, (centre - margin) / denominator), min(1.0, (centre + margin) / denominator)
+
+def wilson_lower_bound(upvotes, downvotes, z=RANK_CONFIDENCE_Z):
+    return wilson_interval(upvotes, downvotes, z)[0]
+
+def _grouped_delta(field, deltas):
+    """Returns F(field) + CASE ... END, with the images sharing a delta sharing a WHEN."""
+    by_delta = {}
+    for image_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(image_id)
+
+    if not by_delta:
+        return F(field)
+
+    return F(field) + Case(
+        *[When(image_id__in=image_ids, then=Value(delta)) for delta, image_ids in by_delta.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+def apply_image_changes(changes):
+    """
+    Applies {image_id: (score, upvotes, downvotes) change} to the images and refreshes their ranks.
+
+    Must run inside a transaction. The counters change with one UPDATE; the ranks are
+    then computed from the updated (locked) rows and written with one more.
+    """
+    changes = {image_id: change for image_id, change in changes.items() if any(change)}
+    if not changes:
+        return
+
+    Image.objects.filter(image_id__in=changes).update(
+        score=_grouped_delta('score', {image_id: change[0] for image_id, change in changes.items()}),
+        upvote_count=_grouped_delta('upvote_count', {image_id: change[1] for image_id, change in changes.items()}),
+        downvote_count=_grouped_delta('downvote_count', {image_id: change[2] for image_id, change in changes.items()}),
+    )
+
+    update_ranks(changes)
+
+def rank_of(row):
+    """Returns an event image's rank: its Elo win chance in pairwise events, otherwise its Wilson lower bound."""
+    if row['event__ranking_mode'] == 'pairwise':
+        return pairwise_rank(row['image__rating'])
+    return wilson_lower_bound(row['image__upvote_count'], row['image__downvote_count'])
+
+def initial_rank(ranking_mode):
+    """Returns the rank of an image just added to an event with this ranking mode, before any vote or comparison."""
+    return rank_of({
+        'event__ranking_mode': ranking_mode,
+        'image__upvote_count': 0,
+        'image__downvote_count': 0,
+        'image__rating': BASE_RATING,
+    })
+
+def update_ranks(image_ids):
+    """Recomputes the rank of the given images from their votes or ratings, and passes the new rankings to the leaderboards."""
+    rows = list(
+        EventContent.objects.filter(image_id__in=image_ids).values(
+            'pk', 'event_id', 'event__ranking_mode', 'image_id', 'image__file_name', 'image__owner_id',
+            'image__score', 'image__upvote_count', 'image__downvote_count', 'image__rating',
+        )
+    )
+    if not rows:
+        return
+
+    ranks = {row['pk']: rank_of(row) for row in rows}
+
+    EventContent.objects.filter(pk__in=ranks).update(rank=Case(
+        *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()],
+        default=F('rank'),
+        output_field=FloatField(),
+    ))
+
+    record_rank_changes([
+        {
+            'event_id': row['event_id'],
+            'content_id': row['pk'],
+            'image_id': row['image_id'],
+            'file_name': row['image__file_name'],
+            'owner_id': row['image__owner_id'],
+            'score': row['image__score'],
+            'rank': ranks[row['pk']],
+        }
+        for row in rows
+    ])
+
+def apply_vote(user_id, image_id, vote):
+    """
+    Records a user's vote on an image and updates the image's score, vote counts and rank.
+
+    The ScoredBy row is locked while the new score is computed, and the image counters
+    change by the difference with a single UPDATE ... SET score = score + delta, in the
+    same transaction, so concurrent voters never overwrite each other.
+
+    Args:
+        user_id: The voting user.
+        image_id: The image voted on.
+        vote: "upvote" or "downvote".
+
+    Returns:
+        tuple: (the user's new score for the image, the change in the image's score)
+    """
+    with transaction.atomic():
+        scored_by, _ = ScoredBy.objects.select_for_update().get_or_create(
+            user_id=user_id, image_id=image_id, defaults={'score': 0}
+        )
+
+        score = step_vote(scored_by.score, vote)
+
+        if score != scored_by.score:
+            ScoredBy.objects.filter(pk=scored_by.pk).update(score=score)
+            apply_image_changes({image_id: vote_change(scored_by.score, score)})
+
+    return score, score - scored_by.score
+
+def retract_vote(image_id, score):
+    """Takes a deleted ScoredBy row's score back out of its image."""
+    with transaction.atomic():
+        apply_image_changes({image_id: vote_change(score, 0)})
+
+def write_scores(previous, scores):
+    """
+    Writes new ScoredBy scores and updates the images by the difference.
+
+    Must run inside a transaction, with the previous rows locked.
+
+    Args:
+        previous: {(user_id, image_id): score} for the rows that already exist.
+        scores: {(user_id, image_id): new score}.
+    """
+    changes = {}
+    for key, score in scores.items():
+        change = vote_change(previous.get(key, 0), score)
+        total = changes.get(key[1], (0, 0, 0))
+        changes[key[1]] = tuple(a + b for a, b in zip(total, change))
+
+    # One INSERT ... ON DUPLICATE KEY UPDATE for new and changed rows alike
+    upserted = [key for key, score in scores.items() if key not in previous or previous[key] != score]
+    if upserted:
+        options = {'update_conflicts': True, 'update_fields': ['score']}
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['image', 'user']
+
+        ScoredBy.objects.bulk_create(
+            [ScoredBy(user_id=user_id, image_id=image_id, score=scores[(user_id, image_id)]) for user_id, image_id in upserted],
+            **options,
+        )
+
+    apply_image_changes(changes)
+
+def apply_votes(user_id, event_id, votes):
+    """
+    Records a batch of votes by one user on images of an event.
+
+    Votes on the same image are applied in order. The image IDs are checked against the
+    event in one query, the ScoredBy rows are read (locked) and upserted in bulk, and
+    every image's counters change by their own delta in one grouped UPDATE.
+
+    Args:
+        user_id: The voting user.
+        event_id: The event the images must belong to.
+        votes: A list of (image_id, vote) pairs, vote being "upvote" or "downvote".
+
+    Returns:
+        tuple: ({image_id: the user's new score}, [image IDs not in the event])
+    """
+    requested = list(dict.fromkeys(image_id for image_id, _ in votes))
+
+    valid = set(
+        EventContent.objects.filter(event_id=event_id, image_id__in=requested)
+        .values_list('image_id', flat=True)
+    )
+    not_found = [image_id for image_id in requested if image_id not in valid]
+
+    with transaction.atomic():
+        previous = dict(
+            ScoredBy.objects.select_for_update()
+            .filter(user_id=user_id, image_id__in=valid)
+            .values_list('image_id', 'score')
+        )
+
+        scores = {}
+        for image_id, vote in votes:
+            if image_id in valid:
+                scores[image_id] = step_vote(scores.get(image_id, previous.get(image_id, 0)), vote)
+
+        write_scores(
+            {(user_id, image_id): score for image_id, score in previous.items()},
+            {(user_id, image_id): score for image_id, score in scores.items()},
+        )
+
+    return scores, not_found